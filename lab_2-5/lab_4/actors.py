@@ -0,0 +1,187 @@
+import queue
+import time
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from agent import DQN
+from tank_env import TankEnv
+
+
+class TransitionQueue:
+    # Single-producer ring in shared memory. Each row is
+    # [state, action, reward, next_state, done] stored as float32.
+    def __init__(self, ctx, capacity, state_size):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.width = 2 * state_size + 3
+        self.data = ctx.RawArray("f", capacity * self.width)
+        self.written = ctx.RawValue("q", 0)
+        self.read = 0
+        # Rows the producer overwrote before the learner got to them
+        self.dropped = 0
+
+    def view(self):
+        return np.frombuffer(self.data, dtype=np.float32).reshape(self.capacity, self.width)
+
+    def drain(self, rows):
+        written = self.written.value
+        # Only the newer half of the ring is read so the producer cannot lap the rows being copied
+        start = max(self.read, written - self.capacity // 2)
+        self.dropped += start - self.read
+        self.read = written
+        if written == start:
+            return None
+        idx = np.arange(start, written) % self.capacity
+        return rows[idx]
+
+
+def rollout_worker(worker_id, seed, epsilon, transitions, shared_model, version, lock, stop, episodes,
+                   sync_every, max_steps):
+    torch.set_num_threads(1)
+    rng = np.random.default_rng(seed)
+    rows = transitions.view()
+    s = transitions.state_size
+    action_size = shared_model.fc3.out_features
+
+    env = TankEnv(seed=seed)
+    model = DQN(s, action_size)
+    local_version = -1
+
+    state = env.reset()
+    total_reward = 0
+    steps = 0
+    while not stop.is_set():
+        if steps % sync_every == 0 and version.value != local_version:
+            with lock:
+                model.load_state_dict(shared_model.state_dict())
+                local_version = version.value
+
+        if rng.random() < epsilon:
+            action = int(rng.integers(action_size))
+        else:
+            with torch.inference_mode():
+                action = int(model(torch.from_numpy(state)).argmax())
+        next_state, reward, done, _ = env.step(action)
+
+        row = rows[transitions.written.value % transitions.capacity]
+        row[:s] = state
+        row[s] = action
+        row[s + 1] = reward
+        row[s + 2:2 * s + 2] = next_state
+        row[2 * s + 2] = done
+        transitions.written.value += 1
+
+        state = next_state
+        total_reward += reward
+        steps += 1
+        if done or steps >= max_steps:
+            episodes.put((worker_id, total_reward))
+            state = env.reset()
+            total_reward = 0
+            steps = 0
+
+
+class RolloutPool:
+    def __init__(self, num_workers, state_size, action_size, queue_capacity=65536, sync_every=400,
+                 max_steps=200, base_epsilon=0.4, epsilon_alpha=7.0, seed=0):
+        self.ctx = mp.get_context("spawn")
+        self.num_workers = num_workers
+        self.state_size = state_size
+        self.sync_every = sync_every
+        self.max_steps = max_steps
+        self.seed = seed
+        # Ape-X style exploration: every worker keeps its own fixed epsilon
+        self.epsilons = [
+            base_epsilon ** (1 + epsilon_alpha * i / max(num_workers - 1, 1)) for i in range(num_workers)
+        ]
+        self.shared_model = DQN(state_size, action_size)
+        self.shared_model.share_memory()
+        self.version = self.ctx.Value("q", 0)
+        self.lock = self.ctx.Lock()
+        self.stop_event = self.ctx.Event()
+        self.episodes = self.ctx.Queue()
+        self.transitions = [TransitionQueue(self.ctx, queue_capacity, state_size) for _ in range(num_workers)]
+        self.views = [t.view() for t in self.transitions]
+        self.processes = []
+
+    def publish(self, model):
+        with self.lock:
+            with torch.no_grad():
+                for shared, param in zip(self.shared_model.parameters(), model.parameters()):
+                    shared.copy_(param)
+            self.version.value += 1
+
+    def start(self, model):
+        self.publish(model)
+        for i in range(self.num_workers):
+            p = self.ctx.Process(
+                target=rollout_worker,
+                args=(i, self.seed + i, self.epsilons[i], self.transitions[i], self.shared_model, self.version,
+                      self.lock, self.stop_event, self.episodes, self.sync_every, self.max_steps),
+                daemon=True,
+            )
+            p.start()
+            self.processes.append(p)
+
+    def collect(self, memory):
+        s = self.state_size
+        received = 0
+        for transitions, rows in zip(self.transitions, self.views):
+            batch = transitions.drain(rows)
+            if batch is None:
+                continue
+            memory.add_batch(batch[:, :s], batch[:, s].astype(np.int64), batch[:, s + 1],
+                             batch[:, s + 2:2 * s + 2], batch[:, 2 * s + 2])
+            received += len(batch)
+        return received
+
+    @property
+    def dropped(self):
+        return sum(t.dropped for t in self.transitions)
+
+    def finished_episodes(self):
+        rewards = []
+        while True:
+            try:
+                rewards.append(self.episodes.get_nowait())
+            except queue.Empty:
+                return rewards
+
+    def close(self):
+        self.stop_event.set()
+        for p in self.processes:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self.processes = []
+
+
+def train_parallel(agent, num_workers, episodes, publish_every=100, train_every=4, on_episode=None, stats=None,
+                   seed=0):
+    # stats, if given, is a dict kept up to date with the pool's counters (e.g. TrainingMonitor.extra);
+    # worker i seeds its env and exploration RNG with seed + i
+    pool = RolloutPool(num_workers, agent.state_size, agent.action_size, seed=seed)
+    pool.start(agent.model)
+    rewards_per_episode = []
+    train_every = agent.train_every or train_every
+    try:
+        while len(rewards_per_episode) < episodes:
+            received = pool.collect(agent.memory)
+            agent.env_steps += received
+            pending = agent.env_steps // train_every - agent.updates
+            if received == 0 and (pending <= 0 or len(agent.memory) < agent.batch_size):
+                time.sleep(0.001)
+            for _ in range(min(pending, 64)):
+                if agent.learn() is None:
+                    break
+                if agent.updates % publish_every == 0:
+                    pool.publish(agent.model)
+            if stats is not None:
+                stats["dropped_transitions"] = pool.dropped
+            for _, total_reward in pool.finished_episodes()[:episodes - len(rewards_per_episode)]:
+                rewards_per_episode.append(total_reward)
+                if on_episode is not None:
+                    on_episode(len(rewards_per_episode), total_reward)
+    finally:
+        pool.close()
+    return rewards_per_episode
@@ -1,10 +1,9 @@
+import copy
 import torch
 import torch.nn as nn
 import torch.optim as optim
-import random
 import numpy as np
-from collections import deque
-from tank_env import TankEnv
+from replay_buffer import PrioritizedReplayBuffer, ReplayBuffer
 
 class DQN(nn.Module):
     def __init__(self, state_size, action_size):
@@ -19,10 +18,22 @@ class DQN(nn.Module):
         return self.fc3(x)
 
 class DQNAgent:
-    def __init__(self, state_size, action_size):
+    def __init__(self, state_size, action_size, memory_size=10000, prioritized=False,
+                 alpha=0.6, beta=0.4, beta_increment=1e-3, train_every=0, gradient_steps=1,
+                 target_update_every=0, tau=1.0, double_dqn=False, seed=None):
         self.state_size = state_size
         self.action_size = action_size
-        self.memory = deque(maxlen=10000)
+        self.prioritized = prioritized
+        self.beta = beta
+        self.beta_increment = beta_increment
+        agent_seed, memory_seed = np.random.SeedSequence(seed).spawn(2)
+        self.rng = np.random.default_rng(agent_seed)
+        if seed is not None:
+            torch.manual_seed(seed)
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(memory_size, state_size, alpha=alpha, seed=memory_seed)
+        else:
+            self.memory = ReplayBuffer(memory_size, state_size, seed=memory_seed)
         self.gamma = 0.99
         self.epsilon = 1.0
         self.epsilon_min = 0.05
@@ -33,36 +44,141 @@ class DQNAgent:
         self.optimizer = optim.Adam(self.model.parameters(), lr=self.learning_rate)
         self.loss_fn = nn.MSELoss()
 
+        # train_every=0 keeps the original schedule: one replay() call per episode
+        self.train_every = train_every
+        self.gradient_steps = gradient_steps
+        self.target_update_every = target_update_every
+        self.tau = tau
+        self.double_dqn = double_dqn
+        self.target_model = None
+        if target_update_every:
+            self.target_model = copy.deepcopy(self.model)
+            self.target_model.requires_grad_(False)
+        self.env_steps = 0
+        self.updates = 0
+        self.state_array = np.empty((1, state_size), dtype=np.float32)
+        self.state_tensor = torch.from_numpy(self.state_array)
+
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
+        self.env_steps += 1
+        if self.train_every and self.env_steps % self.train_every == 0:
+            self.train()
+
+    def remember_batch(self, states, actions, rewards, next_states, dones):
+        self.memory.add_batch(states, actions, rewards, next_states, dones)
+        before = self.env_steps
+        self.env_steps += len(actions)
+        if self.train_every:
+            for _ in range(self.env_steps // self.train_every - before // self.train_every):
+                self.train()
 
     def act(self, state):
-        if np.random.rand() <= self.epsilon:
-            return random.randrange(self.action_size)
-        state_tensor = torch.FloatTensor(state).unsqueeze(0)
+        if self.rng.random() <= self.epsilon:
+            return int(self.rng.integers(self.action_size))
+        self.state_array[0] = state
+        with torch.inference_mode():
+            q_values = self.model(self.state_tensor)
+        return int(q_values.argmax())
+
+    def act_batch(self, states):
+        states = np.asarray(states, dtype=np.float32)
+        with torch.inference_mode():
+            actions = self.model(torch.from_numpy(states)).argmax(1).numpy()
+        explore = self.rng.random(len(states)) <= self.epsilon
+        actions[explore] = self.rng.integers(self.action_size, size=int(explore.sum()))
+        return actions
+
+    def update_target(self):
         with torch.no_grad():
-            q_values = self.model(state_tensor)
-        return torch.argmax(q_values[0]).item()
+            if self.tau >= 1.0:
+                self.target_model.load_state_dict(self.model.state_dict())
+            else:
+                for target, param in zip(self.target_model.parameters(), self.model.parameters()):
+                    target.lerp_(param, self.tau)
 
-    def replay(self):
+    def learn(self):
         if len(self.memory) < self.batch_size:
-            return
-        minibatch = random.sample(self.memory, self.batch_size)
-        states, actions, rewards, next_states, dones = zip(*minibatch)
-        states = torch.FloatTensor(states)
-        next_states = torch.FloatTensor(next_states)
-        actions = torch.LongTensor(actions)
-        rewards = torch.FloatTensor(rewards)
-        dones = torch.FloatTensor(dones)
+            return None
+        if self.prioritized:
+            states, actions, rewards, next_states, dones, weights, idx = self.memory.sample(self.batch_size, self.beta)
+            self.beta = min(1.0, self.beta + self.beta_increment)
+        else:
+            states, actions, rewards, next_states, dones = self.memory.sample(self.batch_size)
 
         q_values = self.model(states).gather(1, actions.unsqueeze(1)).squeeze(1)
-        next_q_values = self.model(next_states).max(1)[0]
-        targets = rewards + self.gamma * next_q_values * (1 - dones)
+        with torch.no_grad():
+            target_model = self.target_model if self.target_model is not None else self.model
+            if self.double_dqn:
+                next_actions = self.model(next_states).argmax(1, keepdim=True)
+                next_q_values = target_model(next_states).gather(1, next_actions).squeeze(1)
+            else:
+                next_q_values = target_model(next_states).max(1)[0]
+            targets = rewards + self.gamma * next_q_values * (1 - dones)
 
-        loss = self.loss_fn(q_values, targets.detach())
+        if self.prioritized:
+            td_errors = targets - q_values
+            loss = (weights * td_errors.pow(2)).mean()
+        else:
+            loss = self.loss_fn(q_values, targets)
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
 
+        if self.prioritized:
+            self.memory.update_priorities(idx, td_errors.detach().numpy())
+
+        self.updates += 1
+        if self.target_model is not None and self.updates % self.target_update_every == 0:
+            self.update_target()
+        return loss.item()
+
+    def train(self):
+        for _ in range(self.gradient_steps):
+            self.learn()
+
+    def decay_epsilon(self):
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
+
+    def replay(self):
+        if len(self.memory) < self.batch_size:
+            return
+        self.train()
+        self.decay_epsilon()
+
+    def end_episode(self):
+        if self.train_every:
+            self.decay_epsilon()
+        else:
+            self.replay()
+
+    def state_dict(self):
+        def clone(state):
+            return {k: v.detach().clone() for k, v in state.items()}
+
+        return {
+            "model": clone(self.model.state_dict()),
+            "target_model": clone(self.target_model.state_dict()) if self.target_model is not None else None,
+            "optimizer": copy.deepcopy(self.optimizer.state_dict()),
+            "memory": self.memory.state_dict(),
+            "epsilon": self.epsilon,
+            "beta": self.beta,
+            "env_steps": self.env_steps,
+            "updates": self.updates,
+            "rng": self.rng.bit_generator.state,
+            "torch_rng": torch.get_rng_state(),
+        }
+
+    def load_state_dict(self, state):
+        self.model.load_state_dict(state["model"])
+        if self.target_model is not None:
+            self.target_model.load_state_dict(state["target_model"] or state["model"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        self.memory.load_state_dict(state["memory"])
+        self.epsilon = state["epsilon"]
+        self.beta = state["beta"]
+        self.env_steps = state["env_steps"]
+        self.updates = state["updates"]
+        self.rng.bit_generator.state = state["rng"]
+        torch.set_rng_state(state["torch_rng"])
@@ -0,0 +1,182 @@
+import numpy as np
+from raycast import ANGLE_STEP, first_hit_distances, padded_obstacles, ray_offset_table, ray_padding
+
+
+class SpatialHash:
+    # Uniform grid over tank centers, rebuilt from scratch every step with a sort
+    def __init__(self, width, height, cell_size):
+        self.cell_size = cell_size
+        self.cols = -(-width // cell_size)
+        self.rows = -(-height // cell_size)
+
+    def cells(self, positions):
+        x = np.clip((positions[:, 0] // self.cell_size).astype(np.int64), 0, self.cols - 1)
+        y = np.clip((positions[:, 1] // self.cell_size).astype(np.int64), 0, self.rows - 1)
+        return x, y
+
+    def build(self, positions):
+        self.x, self.y = self.cells(positions)
+        self.keys = self.y * self.cols + self.x
+        self.order = np.argsort(self.keys, kind="stable")
+        self.sorted_keys = self.keys[self.order]
+        self.counts = np.bincount(self.keys, minlength=self.rows * self.cols)
+
+    def pairs(self, positions, radius):
+        # All (i, j), i < j, whose centers are closer than radius; radius must not exceed cell_size
+        n = len(positions)
+        first, second = [], []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                nx, ny = self.x + dx, self.y + dy
+                valid = (nx >= 0) & (nx < self.cols) & (ny >= 0) & (ny < self.rows)
+                keys = ny * self.cols + nx
+                lo = np.searchsorted(self.sorted_keys, keys, "left")
+                hi = np.searchsorted(self.sorted_keys, keys, "right")
+                counts = np.where(valid, hi - lo, 0)
+                total = counts.sum()
+                if total == 0:
+                    continue
+                i = np.repeat(np.arange(n), counts)
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                j = self.order[np.repeat(lo, counts) + offsets]
+                first.append(i)
+                second.append(j)
+        if not first:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        i, j = np.concatenate(first), np.concatenate(second)
+        keep = i < j
+        i, j = i[keep], j[keep]
+        close = np.sum((positions[i] - positions[j]) ** 2, axis=1) < radius ** 2
+        return i[close], j[close]
+
+
+class TankArena:
+    def __init__(self, num_tanks=128, width=1600, height=1600, grid_size=40, obstacles=None, max_steps=200,
+                 n_rays=4, seed=None):
+        self.num_tanks = num_tanks
+        self.num_envs = num_tanks
+        self.width = width
+        self.height = height
+        self.grid_size = grid_size
+        self.cols = width // grid_size
+        self.rows = height // grid_size
+        self.max_steps = max_steps
+        self.tank_size = 20
+        self.goal_size = 10
+        self.n_rays = n_rays
+        self.ray_offsets = ray_offset_table(n_rays)
+        self.ray_pad = ray_padding(grid_size)
+        self.rng = np.random.default_rng(seed)
+        self.hash = SpatialHash(width, height, self.tank_size)
+        self.tank_index = np.arange(num_tanks)
+        self.tank_pos = np.zeros((num_tanks, 2), dtype=np.float32)
+        self.tank_angle = np.zeros(num_tanks, dtype=np.int64)
+        self.goal_pos = np.zeros((num_tanks, 2), dtype=np.int64)
+        self.steps = np.zeros(num_tanks, dtype=np.int64)
+        # same obstacle density as the 30-obstacle 10x10 TankEnv map
+        self.create_map(int(0.3 * self.rows * self.cols) if obstacles is None else obstacles)
+        self.reset()
+
+    def create_map(self, obstacles):
+        self.map = np.zeros((self.rows, self.cols), dtype=np.int64)
+        self.map[self.rng.integers(0, self.rows, obstacles), self.rng.integers(0, self.cols, obstacles)] = 1
+        self.blocked = padded_obstacles(self.map, self.ray_pad)
+        self.free_cells = np.flatnonzero(self.map.ravel() == 0)
+
+    def random_free_positions(self, n):
+        y, x = np.divmod(self.free_cells[self.rng.integers(0, len(self.free_cells), n)], self.cols)
+        return np.stack([x, y], axis=1) * self.grid_size + self.grid_size // 2
+
+    def respawn(self, idx, attempts=8):
+        self.tank_angle[idx] = 0
+        self.steps[idx] = 0
+        self.goal_pos[idx] = self.random_free_positions(len(idx))
+        self.tank_pos[idx] = -self.width
+        pending = idx
+        for _ in range(attempts):
+            self.tank_pos[pending] = self.random_free_positions(len(pending))
+            self.hash.build(self.tank_pos)
+            i, j = self.hash.pairs(self.tank_pos, self.tank_size)
+            overlapping = np.zeros(self.num_tanks, dtype=bool)
+            overlapping[i] = overlapping[j] = True
+            pending = pending[overlapping[pending]]
+            if len(pending) == 0:
+                break
+
+    def reset(self):
+        self.respawn(self.tank_index)
+        self.hash.build(self.tank_pos)
+        return self.get_state()
+
+    def sensors(self, idx):
+        samples = self.tank_pos[idx, None, None, :] + self.ray_offsets[self.tank_angle[idx] // ANGLE_STEP]
+        cells = (samples // self.grid_size).astype(np.int64) + self.ray_pad
+        hits = self.blocked[cells[..., 1], cells[..., 0]].astype(bool)
+
+        # other tanks: any tank center in the hash cell of a sample point, not counting the tank itself
+        h = self.hash
+        hx = np.clip((samples[..., 0] // h.cell_size).astype(np.int64), 0, h.cols - 1)
+        hy = np.clip((samples[..., 1] // h.cell_size).astype(np.int64), 0, h.rows - 1)
+        keys = hy * h.cols + hx
+        own = h.keys[idx][:, None, None]
+        hits |= h.counts[keys] - (keys == own) > 0
+        return first_hit_distances(hits)
+
+    def get_state(self, idx=None):
+        if idx is None:
+            idx = self.tank_index
+        tank_pos = self.tank_pos[idx]
+        delta = self.goal_pos[idx] - tank_pos
+        angle_to_goal = np.arctan2(delta[:, 1], delta[:, 0]) - np.radians(self.tank_angle[idx])
+
+        state = np.empty((len(idx), 6 + self.n_rays), dtype=np.float32)
+        state[:, 0:2] = tank_pos / self.width
+        state[:, 2] = self.tank_angle[idx] / 360
+        state[:, 3] = np.hypot(delta[:, 0], delta[:, 1]) / self.width
+        state[:, 4] = np.sin(angle_to_goal)
+        state[:, 5] = np.cos(angle_to_goal)
+        state[:, 6:] = self.sensors(idx)
+        return state
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        rewards = np.full(self.num_tanks, -1.0, dtype=np.float32)
+        old_dist = np.linalg.norm(self.tank_pos - self.goal_pos, axis=1)
+
+        angle_rad = np.radians(self.tank_angle)
+        speed = np.where(actions == 0, 5.0, np.where(actions == 1, -5.0, 0.0))
+        new_pos = (self.tank_pos + speed[:, None] * np.stack([np.cos(angle_rad), np.sin(angle_rad)], axis=1)).astype(np.float32)
+        self.tank_angle = np.where(actions == 2, (self.tank_angle - 10) % 360, self.tank_angle)
+        self.tank_angle = np.where(actions == 3, (self.tank_angle + 10) % 360, self.tank_angle)
+
+        reached = (actions == 4) & (old_dist < 20)
+        rewards[reached] = 100
+
+        inside = (new_pos[:, 0] >= 0) & (new_pos[:, 0] < self.width) & (new_pos[:, 1] >= 0) & (new_pos[:, 1] < self.height)
+        grid_x = np.clip(new_pos[:, 0] // self.grid_size, 0, self.cols - 1).astype(np.int64)
+        grid_y = np.clip(new_pos[:, 1] // self.grid_size, 0, self.rows - 1).astype(np.int64)
+        free = inside & (self.map[grid_y, grid_x] == 0)
+        self.tank_pos[free] = new_pos[free]
+
+        self.hash.build(self.tank_pos)
+        i, j = self.hash.pairs(self.tank_pos, self.tank_size)
+        crashed = ~free
+        crashed[i] = crashed[j] = True
+        rewards[crashed] = -10
+        dones = reached | crashed
+
+        new_dist = np.linalg.norm(self.tank_pos - self.goal_pos, axis=1)
+        shaping = np.where(new_dist < old_dist, 10, -5)
+        rewards[~dones] += shaping[~dones]
+
+        self.steps += 1
+        truncated = ~dones & (self.steps >= self.max_steps)
+        state = self.get_state()
+        info = {"final_state": state, "truncated": truncated, "tank_collisions": len(i)}
+        finished = np.flatnonzero(dones | truncated)
+        if len(finished):
+            self.respawn(finished)
+            self.hash.build(self.tank_pos)
+            state = state.copy()
+            state[finished] = self.get_state(finished)
+        return state, rewards, dones, info
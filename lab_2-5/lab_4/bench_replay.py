@@ -0,0 +1,47 @@
+import argparse
+import time
+import numpy as np
+from replay_buffer import PrioritizedReplayBuffer, ReplayBuffer
+
+
+def fill(buffer, state_size, chunk=100_000):
+    rng = np.random.default_rng(0)
+    while len(buffer) < buffer.capacity:
+        n = min(chunk, buffer.capacity - len(buffer))
+        states = rng.random((n, state_size), dtype=np.float32)
+        buffer.add_batch(states, rng.integers(0, 5, n), rng.choice([-6, 9, -10, 100], n), states, rng.random(n) < 0.05)
+
+
+def bench(name, call, iterations):
+    call()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {iterations / elapsed:>10.0f} batches/s  {elapsed / iterations * 1e6:>8.1f} us/batch")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacity", type=int, default=1_000_000)
+    parser.add_argument("--state-size", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    uniform = ReplayBuffer(args.capacity, args.state_size)
+    prioritized = PrioritizedReplayBuffer(args.capacity, args.state_size)
+    fill(uniform, args.state_size)
+    fill(prioritized, args.state_size)
+    print(f"capacity {args.capacity}, batch {args.batch_size}, "
+          f"{uniform.nbytes / 2**20:.0f} MiB transitions + {prioritized.tree.tree.nbytes / 2**20:.0f} MiB sum-tree")
+
+    td = np.random.default_rng(1).standard_normal(args.batch_size)
+    bench("uniform sample", lambda: uniform.sample(args.batch_size), args.iterations)
+    bench("prioritized sample", lambda: prioritized.sample(args.batch_size), args.iterations)
+
+    def sample_and_update():
+        *_, idx = prioritized.sample(args.batch_size)
+        prioritized.update_priorities(idx, td)
+
+    bench("prioritized sample + priority update", sample_and_update, args.iterations)
@@ -0,0 +1,117 @@
+import argparse
+import csv
+import os
+import time
+import tracemalloc
+import numpy as np
+from agent import DQNAgent
+from policy import GreedyPolicy
+from tank_env import TankEnv, VecTankEnv
+
+
+def timeit(call, iterations):
+    call()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_env(iterations):
+    env = TankEnv(seed=0)
+    actions = np.random.default_rng(0).integers(0, 5, iterations + 1)
+    it = iter(actions)
+
+    def step():
+        _, _, done, _ = env.step(next(it))
+        if done:
+            env.reset()
+
+    yield "TankEnv.step", 1 / timeit(step, iterations), "steps/s"
+    yield "TankEnv.get_state", timeit(env.get_state, iterations) * 1e6, "us"
+
+    for num_envs in (64, 256):
+        vec_env = VecTankEnv(num_envs, seed=0)
+        batch = np.random.default_rng(0).integers(0, 5, num_envs)
+        seconds = timeit(lambda: vec_env.step(batch), max(iterations // num_envs, 20))
+        yield f"VecTankEnv.step x{num_envs}", num_envs / seconds, "steps/s"
+
+
+def step_allocations(env, actions, out=None):
+    # Each env.step() runs in its own tracemalloc window: the peak above the heap size read just
+    # before the window is what the step allocated, even if it was freed again
+    allocating = total = 0
+    for action in actions:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        env.step(action, out)
+        extra = tracemalloc.get_traced_memory()[1] - base
+        allocating += extra > 0
+        total += extra
+    return allocating, total / len(actions)
+
+
+def bench_alloc(iterations):
+    # Forward/back pairs cancel out and the turns sweep every heading, so the episode never ends
+    # and no reset lands inside the measured loop
+    env = TankEnv(seed=0)
+    env.set_map(np.zeros((env.rows, env.cols), dtype=int))
+    env.reset()
+    env.tank_pos = np.array([200, 200], dtype=np.float32)
+    env.goal_pos = np.array([20, 380])
+    out = np.empty(env.state_buffer.shape, dtype=np.float32)
+    actions = [0, 0, 1, 1, 2, 2, 3, 3, 3, 4] * max(iterations // 10, 1)
+
+    tracemalloc.start()
+    for name, buffer in (("TankEnv.step(out=)", out), ("TankEnv.step", None)):
+        step_allocations(env, actions[:100], buffer)
+        allocating, per_step = step_allocations(env, actions, buffer)
+        yield f"{name} allocating", allocating / len(actions) * 100, "% of steps"
+        yield f"{name} heap", per_step, "B/step"
+    tracemalloc.stop()
+    assert not env.done
+
+
+def bench_act(iterations):
+    agent = DQNAgent(10, 5, seed=0)
+    agent.epsilon = 0.0
+    state = np.random.default_rng(0).random(10, dtype=np.float32)
+    yield "DQNAgent.act", timeit(lambda: agent.act(state), iterations) * 1e6, "us"
+    policy = GreedyPolicy(agent.model, backend="script")
+    yield "GreedyPolicy (script)", timeit(lambda: policy(state), iterations) * 1e6, "us"
+    states = np.random.default_rng(0).random((256, 10), dtype=np.float32)
+    seconds = timeit(lambda: agent.act_batch(states), max(iterations // 256, 20))
+    yield "DQNAgent.act_batch x256", seconds / 256 * 1e6, "us/state"
+
+
+def bench_replay(iterations, memory_size):
+    for prioritized in (False, True):
+        agent = DQNAgent(10, 5, memory_size=memory_size, prioritized=prioritized, seed=0)
+        rng = np.random.default_rng(0)
+        n = min(memory_size, 100_000)
+        states = rng.random((n, 10), dtype=np.float32)
+        agent.memory.add_batch(states, rng.integers(0, 5, n), rng.choice([-6, 9, -10, 100], n), states,
+                               rng.random(n) < 0.05)
+        name = "prioritized" if prioritized else "uniform"
+        yield f"DQNAgent.learn ({name})", 1 / timeit(agent.learn, iterations // 10), "updates/s"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--memory-size", type=int, default=100_000)
+    parser.add_argument("--output", default=None, help="append results to this CSV for regression tracking")
+    args = parser.parse_args()
+
+    results = [*bench_env(args.iterations), *bench_alloc(args.iterations), *bench_act(args.iterations), *bench_replay(args.iterations, args.memory_size)]
+    for name, value, unit in results:
+        print(f"{name:<28} {value:>12.1f} {unit}")
+
+    if args.output:
+        new_file = not os.path.exists(args.output)
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with open(args.output, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["timestamp", "benchmark", "value", "unit"])
+            writer.writerows([stamp, name, f"{value:.3f}", unit] for name, value, unit in results)
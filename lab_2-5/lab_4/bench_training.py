@@ -0,0 +1,60 @@
+import argparse
+import time
+import numpy as np
+from agent import DQNAgent
+from tank_env import TankEnv
+
+CONFIGS = {
+    "legacy": {},
+    "scheduled": {"train_every": 4, "gradient_steps": 1, "target_update_every": 250},
+    "scheduled-double": {"train_every": 4, "gradient_steps": 1, "target_update_every": 250, "double_dqn": True},
+    "polyak-double": {"train_every": 1, "gradient_steps": 1, "target_update_every": 1, "tau": 0.005,
+                      "double_dqn": True},
+}
+
+
+def run(config, target, episodes, window, seed):
+    env = TankEnv(seed=seed)
+    agent = DQNAgent(len(env.get_state()), 5, seed=seed, **CONFIGS[config])
+    rewards = []
+    env_steps = 0
+    start = time.perf_counter()
+    for e in range(episodes):
+        state = env.reset()
+        total_reward = 0
+        for _ in range(200):
+            action = agent.act(state)
+            next_state, reward, done, _ = env.step(action)
+            agent.remember(state, action, reward, next_state, done)
+            state = next_state
+            total_reward += reward
+            env_steps += 1
+            if done:
+                break
+        agent.end_episode()
+        rewards.append(total_reward)
+        if len(rewards) >= window and np.mean(rewards[-window:]) >= target:
+            return e + 1, env_steps, time.perf_counter() - start, np.mean(rewards[-window:]), True
+    return episodes, env_steps, time.perf_counter() - start, np.mean(rewards[-window:]), False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    parser.add_argument("--episodes", type=int, default=500)
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--target", type=float, default=None,
+                        help="moving-average reward to reach (default: final average in rewards.npy)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    target = args.target
+    if target is None:
+        target = float(np.mean(np.load("rewards.npy")[-args.window:]))
+    print(f"target: mean reward over {args.window} episodes >= {target:.1f}")
+
+    for config in args.configs:
+        episodes, env_steps, seconds, reward, reached = run(config, target, args.episodes, args.window, args.seed)
+        status = "reached" if reached else "not reached"
+        print(f"{config:<18} {status:<12} episodes {episodes:>4}  env steps {env_steps:>7}  "
+              f"{seconds:>7.1f} s  avg reward {reward:>7.1f}")
@@ -0,0 +1,49 @@
+import os
+import queue
+import threading
+import torch
+
+
+def save_checkpoint(path, state):
+    tmp_path = f"{path}.tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    # Checkpoints hold NumPy arrays and RNG states, so they are only loaded from trusted local files
+    return torch.load(path, map_location="cpu", weights_only=False)
+
+
+class CheckpointWriter:
+    # Writes snapshots from a background thread. At most one snapshot waits
+    # behind the one being written, which bounds the extra memory.
+    def __init__(self, path):
+        self.path = path
+        self.pending = queue.Queue(maxsize=1)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            state = self.pending.get()
+            if state is None:
+                return
+            try:
+                save_checkpoint(self.path, state)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.pending.task_done()
+
+    def save(self, state):
+        if self.error is not None:
+            raise self.error
+        self.pending.put(state)
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
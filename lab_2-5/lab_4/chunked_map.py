@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class ChunkedOccupancy:
+    # Obstacle grid split into tile_size x tile_size tiles, each stored
+    # bit-packed (one bit per cell). Tiles are created on first access by
+    # `loader(tile_row, tile_col)`, and all-free tiles are not stored at all.
+    def __init__(self, rows, cols, tile_size=64, loader=None):
+        if tile_size % 8:
+            raise ValueError("tile_size must be a multiple of 8")
+        self.rows = rows
+        self.cols = cols
+        self.tile_size = tile_size
+        self.tile_cols = -(-cols // tile_size)
+        self.loader = loader
+        self.tiles = {}
+        self.empty = np.zeros((tile_size, tile_size // 8), dtype=np.uint8)
+
+    @classmethod
+    def random(cls, rows, cols, density, tile_size=64, seed=0):
+        def loader(tile_row, tile_col):
+            rng = np.random.default_rng([seed, tile_row, tile_col])
+            return rng.random((tile_size, tile_size)) < density
+
+        return cls(rows, cols, tile_size, loader)
+
+    @property
+    def shape(self):
+        return self.rows, self.cols
+
+    @property
+    def nbytes(self):
+        return sum(tile.nbytes for tile in self.tiles.values() if tile is not None)
+
+    def tile(self, key):
+        if key not in self.tiles:
+            cells = self.loader(*divmod(key, self.tile_cols)) if self.loader is not None else None
+            self.tiles[key] = np.packbits(cells, axis=1) if cells is not None and cells.any() else None
+        tile = self.tiles[key]
+        return self.empty if tile is None else tile
+
+    def lookup(self, rows, cols):
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        out = np.ones(rows.shape, dtype=np.uint8)
+        r, c = rows[inside], cols[inside]
+        t = self.tile_size
+        keys, which = np.unique((r // t) * self.tile_cols + c // t, return_inverse=True)
+        tiles = np.stack([self.tile(int(key)) for key in keys]) if len(keys) else self.empty[None]
+        r, c = r % t, c % t
+        out[inside] = (tiles[which, r, c >> 3] >> (7 - (c & 7))) & 1
+        return out
+
+    def __getitem__(self, index):
+        return int(self.lookup(*index))
+
+    def __setitem__(self, index, value):
+        r, c = index
+        if not (0 <= r < self.rows and 0 <= c < self.cols):
+            raise IndexError(index)
+        t = self.tile_size
+        key = (r // t) * self.tile_cols + c // t
+        tile = self.tile(key)
+        if tile is self.empty:
+            tile = self.tiles[key] = self.empty.copy()
+        bit = np.uint8(1 << (7 - (c % t) % 8))
+        if value:
+            tile[r % t, (c % t) >> 3] |= bit
+        else:
+            tile[r % t, (c % t) >> 3] &= ~bit
+
+    def save(self, path):
+        keys = np.array([k for k, tile in self.tiles.items() if tile is not None], dtype=np.int64)
+        data = np.stack([self.tiles[k] for k in keys]) if len(keys) else np.zeros((0,) + self.empty.shape, np.uint8)
+        np.savez(path, rows=self.rows, cols=self.cols, tile_size=self.tile_size, keys=keys, tiles=data)
+
+    @classmethod
+    def load(cls, path, loader=None):
+        with np.load(path) as data:
+            occupancy = cls(int(data["rows"]), int(data["cols"]), int(data["tile_size"]), loader)
+            occupancy.tiles = dict(zip(data["keys"].tolist(), data["tiles"]))
+        return occupancy
@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import torch.multiprocessing as mp
+from map_pool import MapPool
+from policy import GreedyPolicy
+from tank_env import VecTankEnv
+
+TIMEOUT, SUCCESS, COLLISION = 0, 1, 2
+PERCENTILES = (50, 90, 99)
+
+
+def evaluation_set(pool, episodes, seed=0, tier=None):
+    # Fixed (map, goal) pairs: the same seed always evaluates the same episodes
+    return pool.sample(np.random.default_rng(seed), episodes, tier)
+
+
+def run_episodes(policy, pool, map_ids, goal_cells, num_envs=256, max_steps=200):
+    # Keeps num_envs slots busy, loading the next episode into a slot as soon as its last one ends
+    n = len(map_ids)
+    outcomes = np.full(n, TIMEOUT, dtype=np.int8)
+    steps = np.zeros(n, dtype=np.int32)
+    returns = np.zeros(n, dtype=np.float32)
+    num_envs = min(num_envs, n)
+    env = VecTankEnv(num_envs, max_steps=max_steps, map_pool=pool)
+    slots = np.arange(num_envs)
+    episode = slots.copy()
+    next_episode = num_envs
+
+    def load(slots, episodes):
+        env.reset_envs(slots)
+        env.maps[slots] = pool.maps[map_ids[episodes]]
+        env.blocked[slots] = pool.blocked[map_ids[episodes]]
+        env.goal_pos[slots] = pool.goal_positions(goal_cells[episodes])
+
+    load(slots, episode)
+    states = env.get_state()
+    live = np.ones(num_envs, dtype=bool)
+    while live.any():
+        states, rewards, dones, info = env.step(policy.act_batch(states))
+        ids = episode[live]
+        returns[ids] += rewards[live]
+        steps[ids] += 1
+        finished = np.flatnonzero(live & (dones | info["truncated"]))
+        if len(finished) == 0:
+            continue
+        ids = episode[finished]
+        outcomes[ids] = np.where(~dones[finished], TIMEOUT, np.where(rewards[finished] == 100, SUCCESS, COLLISION))
+
+        refill = finished[:n - next_episode]
+        live[finished[len(refill):]] = False
+        if len(refill):
+            episode[refill] = np.arange(next_episode, next_episode + len(refill))
+            next_episode += len(refill)
+            load(refill, episode[refill])
+            states[refill] = env.get_state(refill)
+    return outcomes, steps, returns
+
+
+worker_state = {}
+
+
+def init_worker(model_path, pool_arrays, num_envs, max_steps):
+    worker_state["policy"] = GreedyPolicy(model_path, backend="script", num_threads=1)
+    worker_state["pool"] = MapPool(*pool_arrays)
+    worker_state["num_envs"] = num_envs
+    worker_state["max_steps"] = max_steps
+
+
+def evaluate_chunk(task):
+    start, map_ids, goal_cells = task
+    result = run_episodes(worker_state["policy"], worker_state["pool"], map_ids, goal_cells,
+                          worker_state["num_envs"], worker_state["max_steps"])
+    return start, result
+
+
+def evaluate(model_path, pool, map_ids, goal_cells, num_envs=256, max_steps=200, workers=None):
+    workers = workers or os.cpu_count()
+    n = len(map_ids)
+    if workers == 1:
+        policy = GreedyPolicy(model_path, backend="script", num_threads=1)
+        return run_episodes(policy, pool, map_ids, goal_cells, num_envs, max_steps)
+
+    outcomes = np.empty(n, dtype=np.int8)
+    steps = np.empty(n, dtype=np.int32)
+    returns = np.empty(n, dtype=np.float32)
+    # A few chunks per worker so a slow chunk does not leave the other cores idle at the end
+    bounds = np.linspace(0, n, min(workers * 4, n) + 1).astype(int)
+    tasks = [(a, map_ids[a:b], goal_cells[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+    pool_arrays = (pool.maps, pool.tiers, pool.goal_offsets, pool.goal_cells, pool.grid_size, pool.start)
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(workers, initializer=init_worker, initargs=(model_path, pool_arrays, num_envs, max_steps)) as procs:
+        for start, (o, s, r) in procs.imap_unordered(evaluate_chunk, tasks):
+            outcomes[start:start + len(o)] = o
+            steps[start:start + len(o)] = s
+            returns[start:start + len(o)] = r
+    return outcomes, steps, returns
+
+
+def summarize(outcomes, steps, returns):
+    success = outcomes == SUCCESS
+    report = {
+        "episodes": len(outcomes),
+        "success_rate": float(success.mean()),
+        "collision_rate": float((outcomes == COLLISION).mean()),
+        "timeout_rate": float((outcomes == TIMEOUT).mean()),
+        "mean_return": float(returns.mean()),
+        "mean_steps_to_goal": float(steps[success].mean()) if success.any() else None,
+    }
+    for p in PERCENTILES:
+        report[f"steps_to_goal_p{p}"] = float(np.percentile(steps[success], p)) if success.any() else None
+    for p in PERCENTILES:
+        report[f"return_p{p}"] = float(np.percentile(returns, p))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="dqn_model.pth")
+    parser.add_argument("--episodes", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0, help="selects the fixed set of evaluation maps and goals")
+    parser.add_argument("--map-pool", default=None,
+                        help="evaluate on a map_pool.py .npz file instead of freshly generated maps")
+    parser.add_argument("--tier", type=int, default=None, help="restrict a map pool to one difficulty tier")
+    parser.add_argument("--maps", type=int, default=2048, help="number of maps to generate without --map-pool")
+    parser.add_argument("--obstacles", type=int, default=30, help="obstacles per generated map (same as TankEnv)")
+    parser.add_argument("--num-envs", type=int, default=256, help="environments stepped together per process")
+    parser.add_argument("--max-steps", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=0, help="evaluation processes (0: one per CPU core)")
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    parser.add_argument("--min-success-rate", type=float, default=None,
+                        help="exit with status 1 when the success rate is below this value")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.map_pool:
+        pool = MapPool.load(args.map_pool)
+    else:
+        pool = MapPool.generate(args.maps, obstacle_counts=(args.obstacles,), seed=args.seed)
+    map_ids, goal_cells = evaluation_set(pool, args.episodes, args.seed, args.tier)
+    outcomes, steps, returns = evaluate(args.model, pool, map_ids, goal_cells, args.num_envs, args.max_steps,
+                                        args.workers or None)
+    report = summarize(outcomes, steps, returns)
+    report["seconds"] = time.perf_counter() - start
+
+    for name, value in report.items():
+        print(f"{name:<20} {'-' if value is None else round(value, 4)}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.min_success_rate is not None and report["success_rate"] < args.min_success_rate:
+        sys.exit(1)
@@ -1,33 +1,185 @@
 from agent import DQNAgent
-from tank_env import TankEnv
+from tank_env import TankEnv, VecTankEnv
+from checkpoint import CheckpointWriter, load_checkpoint
+from metrics import PhaseTimer, TrainingMonitor
+from map_pool import Curriculum, MapPool
+from arena import TankArena
+from trajectory_store import TrajectoryReader, TrajectoryWriter, fill_replay
+import argparse
+import os
 import torch
 import numpy as np
 
 if __name__ == "__main__":
-    env = TankEnv()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=500)
+    parser.add_argument("--render", action="store_true", help="show the pygame window (30 FPS)")
+    parser.add_argument("--snapshot-every", type=int, default=0,
+                        help="save the frames of every N-th episode as a .npy video")
+    parser.add_argument("--snapshot-dir", default="snapshots")
+    parser.add_argument("--prioritized", action="store_true", help="use prioritized experience replay")
+    parser.add_argument("--train-every", type=int, default=0,
+                        help="train every N environment steps (0: once per episode)")
+    parser.add_argument("--gradient-steps", type=int, default=1)
+    parser.add_argument("--target-update-every", type=int, default=0,
+                        help="update the target network every N gradient steps (0: no target network)")
+    parser.add_argument("--tau", type=float, default=1.0, help="Polyak factor for target updates (1: hard copy)")
+    parser.add_argument("--double-dqn", action="store_true")
+    parser.add_argument("--num-envs", type=int, default=1,
+                        help="step N environments at once with batched action selection")
+    parser.add_argument("--arena", type=int, default=0,
+                        help="train one shared policy on N tanks moving in a common arena")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="collect experience with N rollout processes feeding this learner")
+    parser.add_argument("--map-pool", default=None, help="sample maps and goals from a map_pool.py .npz file")
+    parser.add_argument("--curriculum", action="store_true",
+                        help="start on the easiest map tier and move up as the success rate improves")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--checkpoint", default="checkpoint.pt")
+    parser.add_argument("--checkpoint-every", type=int, default=0,
+                        help="write a full training checkpoint every N episodes (0: off)")
+    parser.add_argument("--resume", action="store_true", help="continue from --checkpoint")
+    parser.add_argument("--metrics", default="metrics.csv", help="per-episode metrics CSV ('' to disable)")
+    parser.add_argument("--print-every", type=int, default=10)
+    parser.add_argument("--profile", action="store_true",
+                        help="time env.step, get_state, act and learn, each without the others it calls, "
+                             "and add the phases to the metrics")
+    parser.add_argument("--trajectories", default=None,
+                        help="append every step to a memory-mapped trajectory store in this directory")
+    parser.add_argument("--seed-replay", default=None,
+                        help="fill the replay buffer from a trajectory store before training")
+    args = parser.parse_args()
+    if args.trajectories and args.workers:
+        parser.error("--trajectories is not supported with --workers")
+    if args.profile and args.workers:
+        parser.error("--profile is not supported with --workers: the env steps run in the worker processes")
+    if (args.checkpoint_every or args.resume) and (args.num_envs > 1 or args.arena or args.workers):
+        parser.error("--checkpoint-every and --resume are only supported in the single-env loop")
+
+    map_pool = MapPool.load(args.map_pool) if args.map_pool else None
+    curriculum = Curriculum(map_pool) if map_pool is not None and args.curriculum else None
+    tier = curriculum.tier if curriculum else None
+
+    env_seed, agent_seed, worker_seed = np.random.SeedSequence(args.seed).spawn(3)
+    env = TankEnv(render_mode="human" if args.render else None, seed=env_seed, map_pool=map_pool, tier=tier)
     state_size = len(env.get_state())
     action_size = 5
-    agent = DQNAgent(state_size, action_size)
+    agent = DQNAgent(
+        state_size, action_size, prioritized=args.prioritized,
+        train_every=args.train_every, gradient_steps=args.gradient_steps,
+        target_update_every=args.target_update_every, tau=args.tau, double_dqn=args.double_dqn,
+        seed=None if args.seed is None else int(agent_seed.generate_state(1)[0]),
+    )
 
-    episodes = 500
+    episodes = args.episodes
     rewards_per_episode = []
+    first_episode = 0
+    if args.resume:
+        checkpoint = load_checkpoint(args.checkpoint)
+        agent.load_state_dict(checkpoint["agent"])
+        env.load_state_dict(checkpoint["env"])
+        rewards_per_episode = list(checkpoint["rewards"])
+        first_episode = checkpoint["episode"]
+        if curriculum and "curriculum" in checkpoint:
+            curriculum.load_state_dict(checkpoint["curriculum"])
+            env.tier = curriculum.tier
+        print(f"Resumed from {args.checkpoint} after episode {first_episode}")
+    writer = CheckpointWriter(args.checkpoint) if args.checkpoint_every else None
+    trajectories = TrajectoryWriter(args.trajectories, state_size) if args.trajectories else None
+    if trajectories and args.resume and "trajectories" in checkpoint:
+        trajectories.truncate(*checkpoint["trajectories"])
+    if args.seed_replay:
+        print(f"Seeded the replay buffer with {fill_replay(agent.memory, TrajectoryReader(args.seed_replay))} "
+              f"transitions from {args.seed_replay}")
+
+    vec_env = None
+    if args.arena:
+        vec_env = TankArena(args.arena, seed=env_seed)
+    elif args.num_envs > 1:
+        vec_env = VecTankEnv(args.num_envs, map_pool=map_pool, tier=tier, seed=env_seed)
+
+    timer = None
+    if args.profile:
+        timer = PhaseTimer()
+        timer.instrument(vec_env or env, "step", "env_step")
+        timer.instrument(vec_env or env, "get_state")
+        timer.instrument(agent, "act_batch" if vec_env else "act", "act")
+        timer.instrument(agent, "learn")
+    monitor = TrainingMonitor(agent, episodes, args.metrics or None, args.print_every, timer)
+
+    if args.workers:
+        from actors import train_parallel
+        rewards_per_episode = train_parallel(agent, args.workers, episodes, on_episode=monitor.episode,
+                                             stats=monitor.extra, seed=int(worker_seed.generate_state(1)[0]))
+    elif vec_env is not None:
+        states = vec_env.reset()
+        totals = np.zeros(vec_env.num_envs)
+        episode_ids = trajectories.new_episodes(vec_env.num_envs) if trajectories else None
+        while len(rewards_per_episode) < episodes:
+            actions = agent.act_batch(states)
+            next_states, rewards, dones, info = vec_env.step(actions)
+            agent.remember_batch(states, actions, rewards, info["final_state"], dones)
+            if trajectories:
+                trajectories.append_batch(states, actions, rewards, dones, episode_ids)
+            states = next_states
+            totals += rewards
+            for i in np.flatnonzero(dones | info["truncated"])[:episodes - len(rewards_per_episode)]:
+                agent.end_episode()
+                rewards_per_episode.append(totals[i])
+                totals[i] = 0
+                if trajectories:
+                    episode_ids[i] = trajectories.new_episode()
+                if curriculum:
+                    vec_env.tier = curriculum.record(dones[i] and rewards[i] == 100)
+                monitor.episode(len(rewards_per_episode), rewards_per_episode[-1])
+    else:
+        for e in range(first_episode, episodes):
+            state = env.reset()
+            snapshot = args.snapshot_every and (e + 1) % args.snapshot_every == 0
+            frames = [env.render_array().copy()] if snapshot else None
+            total_reward = 0
+            episode_id = trajectories.new_episode() if trajectories else None
+            for time in range(200):
+                env.render()
+                action = agent.act(state)
+                next_state, reward, done, _ = env.step(action)
+                agent.remember(state, action, reward, next_state, done)
+                if trajectories:
+                    trajectories.append(state, action, reward, done, episode_id)
+                state = next_state
+                total_reward += reward
+                if snapshot:
+                    frames.append(env.render_array().copy())
+                if done:
+                    break
+            agent.end_episode()
+            rewards_per_episode.append(total_reward)
+            if curriculum:
+                env.tier = curriculum.record(done and reward == 100)
+            monitor.episode(e + 1, total_reward)
+            if snapshot:
+                os.makedirs(args.snapshot_dir, exist_ok=True)
+                np.save(os.path.join(args.snapshot_dir, f"episode_{e+1:05d}.npy"), np.stack(frames))
+            if writer and (e + 1) % args.checkpoint_every == 0:
+                checkpoint_state = {
+                    "episode": e + 1,
+                    "rewards": list(rewards_per_episode),
+                    "agent": agent.state_dict(),
+                    "env": env.state_dict(),
+                }
+                if curriculum:
+                    checkpoint_state["curriculum"] = curriculum.state_dict()
+                if trajectories:
+                    trajectories.commit()
+                    checkpoint_state["trajectories"] = (trajectories.length, trajectories.next_episode)
+                writer.save(checkpoint_state)
 
-    for e in range(episodes):
-        state = env.reset()
-        total_reward = 0
-        for time in range(200):
-            env.render()  
-            action = agent.act(state)
-            next_state, reward, done, _ = env.step(action)
-            agent.remember(state, action, reward, next_state, done)
-            state = next_state
-            total_reward += reward
-            if done:
-                break
-        agent.replay()
-        rewards_per_episode.append(total_reward)
-        print(f"Episode {e+1}/{episodes} — Reward: {total_reward} — Epsilon: {agent.epsilon:.2f}")
+    if writer:
+        writer.close()
+    if trajectories:
+        trajectories.close()
+    monitor.close()
 
     np.save("rewards.npy", rewards_per_episode)
     torch.save(agent.model.state_dict(), "dqn_model.pth")
-    env.close()
\ No newline at end of file
+    env.close()
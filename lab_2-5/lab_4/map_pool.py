@@ -0,0 +1,133 @@
+import argparse
+import numpy as np
+from raycast import padded_obstacles, ray_padding
+
+START_POS = (50, 50)
+
+
+def reachable_cells(maps, start_cell):
+    # Batched 4-connected flood fill from the start cell over free cells
+    free = maps == 0
+    reach = np.zeros_like(free)
+    reach[:, start_cell[0], start_cell[1]] = free[:, start_cell[0], start_cell[1]]
+    while True:
+        grown = reach.copy()
+        grown[:, 1:, :] |= reach[:, :-1, :]
+        grown[:, :-1, :] |= reach[:, 1:, :]
+        grown[:, :, 1:] |= reach[:, :, :-1]
+        grown[:, :, :-1] |= reach[:, :, 1:]
+        grown &= free
+        if np.array_equal(grown, reach):
+            return reach
+        reach = grown
+
+
+class MapPool:
+    def __init__(self, maps, tiers, goal_offsets, goal_cells, grid_size, start=START_POS):
+        self.maps = maps
+        self.tiers = tiers
+        self.goal_offsets = goal_offsets
+        self.goal_cells = goal_cells
+        self.grid_size = grid_size
+        self.start = tuple(start)
+        self.rows, self.cols = maps.shape[1:]
+        self.blocked = padded_obstacles(maps, ray_padding(grid_size))
+        self.tier_maps = [np.flatnonzero(tiers == t) for t in range(int(tiers.max()) + 1)]
+
+    @property
+    def num_tiers(self):
+        return len(self.tier_maps)
+
+    @classmethod
+    def generate(cls, maps_per_tier=256, rows=10, cols=10, grid_size=40, obstacle_counts=(10, 20, 30, 40),
+                 start=START_POS, seed=None):
+        rng = np.random.default_rng(seed)
+        start_cell = (start[1] // grid_size, start[0] // grid_size)
+        maps, tiers, goals = [], [], []
+        for tier, obstacles in enumerate(obstacle_counts):
+            accepted = 0
+            while accepted < maps_per_tier:
+                batch = np.zeros((maps_per_tier, rows, cols), dtype=np.uint8)
+                r = rng.integers(0, rows, size=(maps_per_tier, obstacles))
+                c = rng.integers(0, cols, size=(maps_per_tier, obstacles))
+                batch[np.arange(maps_per_tier)[:, None], r, c] = 1
+                reach = reachable_cells(batch, start_cell)
+                reach[:, start_cell[0], start_cell[1]] = False
+                valid = np.flatnonzero(reach.reshape(maps_per_tier, -1).any(axis=1))[:maps_per_tier - accepted]
+                maps.append(batch[valid])
+                goals.extend(np.flatnonzero(reach[i].ravel()) for i in valid)
+                accepted += len(valid)
+            tiers.append(np.full(maps_per_tier, tier, dtype=np.int8))
+        goal_offsets = np.zeros(len(goals) + 1, dtype=np.int64)
+        np.cumsum([len(g) for g in goals], out=goal_offsets[1:])
+        return cls(np.concatenate(maps), np.concatenate(tiers), goal_offsets,
+                   np.concatenate(goals).astype(np.int32), grid_size, start)
+
+    def save(self, path):
+        np.savez_compressed(path, maps=self.maps, tiers=self.tiers, goal_offsets=self.goal_offsets,
+                            goal_cells=self.goal_cells, grid_size=self.grid_size, start=np.array(self.start))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["maps"], data["tiers"], data["goal_offsets"], data["goal_cells"],
+                       int(data["grid_size"]), tuple(data["start"]))
+
+    def sample(self, rng, n, tier=None):
+        candidates = self.tier_maps[tier] if tier is not None else None
+        if candidates is None:
+            map_ids = rng.integers(0, len(self.maps), size=n)
+        else:
+            map_ids = candidates[rng.integers(0, len(candidates), size=n)]
+        starts = self.goal_offsets[map_ids]
+        counts = self.goal_offsets[map_ids + 1] - starts
+        goal_cells = self.goal_cells[starts + (rng.random(n) * counts).astype(np.int64)]
+        return map_ids, goal_cells
+
+    def goal_positions(self, goal_cells):
+        y, x = np.divmod(goal_cells, self.cols)
+        return np.stack([x, y], axis=-1) * self.grid_size + self.grid_size // 2
+
+
+class Curriculum:
+    def __init__(self, pool, window=100, promote_at=0.6, tier=0):
+        self.pool = pool
+        self.window = window
+        self.promote_at = promote_at
+        self.tier = tier
+        self.results = []
+
+    def record(self, success):
+        self.results.append(bool(success))
+        if len(self.results) >= self.window:
+            rate = sum(self.results[-self.window:]) / self.window
+            if rate >= self.promote_at and self.tier < self.pool.num_tiers - 1:
+                self.tier += 1
+                self.results = []
+        return self.tier
+
+    def state_dict(self):
+        return {"tier": self.tier, "results": list(self.results)}
+
+    def load_state_dict(self, state):
+        self.tier = state["tier"]
+        self.results = list(state["results"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default="maps.npz")
+    parser.add_argument("--maps-per-tier", type=int, default=1024)
+    parser.add_argument("--obstacles", type=int, nargs="+", default=[10, 20, 30, 40],
+                        help="obstacle count of each difficulty tier")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--grid-size", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pool = MapPool.generate(args.maps_per_tier, args.rows, args.cols, args.grid_size, tuple(args.obstacles),
+                            seed=args.seed)
+    pool.save(args.output)
+    print(f"{len(pool.maps)} maps in {pool.num_tiers} tiers, {len(pool.goal_cells)} reachable goal cells "
+          f"-> {args.output}")
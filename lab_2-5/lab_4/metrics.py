@@ -0,0 +1,135 @@
+import csv
+import queue
+import threading
+import time
+from time import perf_counter_ns
+
+
+class PhaseTimer:
+    # Wraps methods of live objects so that un-profiled runs pay nothing. Phases are exclusive:
+    # time spent in an instrumented call made from inside another one (get_state inside step)
+    # counts only towards the inner phase, so the phases add up to the wall time they cover.
+    def __init__(self):
+        self.totals = {}
+        self.calls = {}
+        self.nested = 0
+
+    def instrument(self, obj, name, phase=None):
+        phase = phase or name
+        method = getattr(obj, name)
+        totals, calls = self.totals, self.calls
+        totals[phase] = 0
+        calls[phase] = 0
+
+        def timed(*args, **kwargs):
+            outer, self.nested = self.nested, 0
+            start = perf_counter_ns()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                totals[phase] += elapsed - self.nested
+                calls[phase] += 1
+                self.nested = outer + elapsed
+            return result
+
+        setattr(obj, name, timed)
+
+    def collect(self):
+        phases = {phase: (self.totals[phase] / 1e9, self.calls[phase]) for phase in self.totals}
+        for phase in self.totals:
+            self.totals[phase] = 0
+            self.calls[phase] = 0
+        return phases
+
+
+class MetricsWriter:
+    def __init__(self, path):
+        self.path = path
+        self.rows = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        with open(self.path, "w", newline="") as f:
+            writer = None
+            while True:
+                row = self.rows.get()
+                if row is None:
+                    return
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+                if self.rows.empty():
+                    f.flush()
+
+    def write(self, row):
+        self.rows.put(row)
+
+    def close(self):
+        self.rows.put(None)
+        self.thread.join()
+
+
+class TrainingMonitor:
+    def __init__(self, agent, episodes, path=None, print_every=10, timer=None):
+        self.agent = agent
+        self.episodes = episodes
+        self.print_every = print_every
+        self.timer = timer
+        self.writer = MetricsWriter(path) if path else None
+        self.start = time.perf_counter()
+        self.last_time = self.start
+        self.last_steps = agent.env_steps
+        self.last_updates = agent.updates
+        self.recent_rewards = []
+        self.phase_totals = {}
+        # Counters owned by the training loop, written into every row as they stand
+        self.extra = {}
+
+    def episode(self, episode, reward):
+        now = time.perf_counter()
+        interval = max(now - self.last_time, 1e-9)
+        agent = self.agent
+        row = {
+            "episode": episode,
+            "reward": reward,
+            "epsilon": round(agent.epsilon, 4),
+            "env_steps": agent.env_steps,
+            "updates": agent.updates,
+            "elapsed": round(now - self.start, 4),
+            "steps_per_sec": round((agent.env_steps - self.last_steps) / interval, 1),
+            "updates_per_sec": round((agent.updates - self.last_updates) / interval, 1),
+        }
+        row.update(self.extra)
+        if self.timer is not None:
+            for phase, (seconds, calls) in self.timer.collect().items():
+                row[f"{phase}_ms"] = round(seconds * 1e3, 3)
+                total, count = self.phase_totals.get(phase, (0.0, 0))
+                self.phase_totals[phase] = (total + seconds, count + calls)
+        if self.writer is not None:
+            self.writer.write(row)
+        self.last_time, self.last_steps, self.last_updates = now, agent.env_steps, agent.updates
+
+        self.recent_rewards.append(reward)
+        if self.print_every and (episode % self.print_every == 0 or episode == self.episodes):
+            self.report(episode)
+
+    def report(self, episode):
+        elapsed = time.perf_counter() - self.start
+        line = (f"Episode {episode}/{self.episodes} — Avg reward: {sum(self.recent_rewards) / len(self.recent_rewards):.1f}"
+                f" — Epsilon: {self.agent.epsilon:.2f} — {self.agent.env_steps / elapsed:.0f} steps/s"
+                f" — {self.agent.updates / elapsed:.1f} updates/s")
+        for name, value in self.extra.items():
+            line += f" — {name.replace('_', ' ')}: {value}"
+        if self.phase_totals:
+            line += " — " + ", ".join(
+                f"{phase} {total / max(count, 1) * 1e6:.0f} us" for phase, (total, count) in self.phase_totals.items()
+            )
+        print(line)
+        self.recent_rewards = []
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
@@ -0,0 +1,65 @@
+import argparse
+import time
+import numpy as np
+import torch
+from agent import DQN
+
+BACKENDS = ("script", "compile", "eager")
+
+
+class GreedyPolicy:
+    def __init__(self, model, state_size=10, action_size=5, backend="script", num_threads=1):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend!r}")
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        if not isinstance(model, torch.nn.Module):
+            state_dict = torch.load(model, map_location="cpu")
+            model = DQN(state_size, action_size)
+            model.load_state_dict(state_dict)
+        model.eval()
+        if backend == "script":
+            model = torch.jit.optimize_for_inference(torch.jit.script(model))
+        elif backend == "compile":
+            model = torch.compile(model, mode="max-autotune-no-cudagraphs")
+        self.model = model
+        self.backend = backend
+        self.input_array = np.empty((1, state_size), dtype=np.float32)
+        self.input_tensor = torch.from_numpy(self.input_array)
+        with torch.inference_mode():
+            self.model(self.input_tensor)
+
+    def __call__(self, state):
+        self.input_array[0] = state
+        with torch.inference_mode():
+            return int(self.model(self.input_tensor).argmax())
+
+    def act_batch(self, states):
+        states = np.asarray(states, dtype=np.float32)
+        with torch.inference_mode():
+            return self.model(torch.from_numpy(states)).argmax(1).numpy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="dqn_model.pth")
+    parser.add_argument("--backends", nargs="+", default=["eager", "script"], choices=BACKENDS)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    states = np.random.default_rng(0).random((args.batch_size, 10), dtype=np.float32)
+    for backend in args.backends:
+        policy = GreedyPolicy(args.model, backend=backend)
+        for state in states[:100]:
+            policy(state)
+        start = time.perf_counter()
+        for i in range(args.iterations):
+            policy(states[i % args.batch_size])
+        single = (time.perf_counter() - start) / args.iterations
+        start = time.perf_counter()
+        for _ in range(args.iterations // 100):
+            policy.act_batch(states)
+        batched = (time.perf_counter() - start) / (args.iterations // 100) / args.batch_size
+        print(f"{backend:<8} {single * 1e6:>7.1f} us/decision  {batched * 1e6:>7.2f} us/decision "
+              f"batched x{args.batch_size}")
@@ -0,0 +1,51 @@
+import math
+import numpy as np
+
+MAX_DIST = 100.0
+STEP = 5
+ANGLE_STEP = 10
+
+
+def sensor_angles(n_rays):
+    if n_rays == 4:
+        # forward, backward, left, right - the layout the DQN was trained on
+        return np.array([0.0, math.pi, -math.pi / 2, math.pi / 2])
+    return np.arange(n_rays) * (2 * math.pi / n_rays)
+
+
+def ray_offset_table(n_rays, max_dist=MAX_DIST, step=STEP):
+    headings = np.radians(np.arange(0, 360, ANGLE_STEP))[:, None] + sensor_angles(n_rays)
+    directions = np.stack([np.cos(headings), np.sin(headings)], axis=-1)
+    distances = np.arange(1, int(max_dist / step) + 1) * step
+    return directions[:, :, None, :] * distances[:, None]
+
+
+def ray_padding(grid_size, max_dist=MAX_DIST, step=STEP):
+    return int(math.ceil((max_dist + step) / grid_size)) + 1
+
+
+def padded_obstacles(grid, pad):
+    rows, cols = grid.shape[-2:]
+    blocked = np.ones(grid.shape[:-2] + (rows + 2 * pad, cols + 2 * pad), dtype=np.uint8)
+    blocked[..., pad:pad + rows, pad:pad + cols] = grid
+    return blocked
+
+
+def first_hit_distances(hits, max_dist=MAX_DIST, step=STEP):
+    first = hits.argmax(axis=-1)
+    return np.where(hits.any(axis=-1), first * step / max_dist, 1.0)
+
+
+def cast_rays(blocked, pad, grid_size, positions, offsets, env=None, max_dist=MAX_DIST, step=STEP):
+    samples = positions[..., None, None, :] + offsets
+    cells = (samples // grid_size).astype(np.int64) + pad
+    if env is None:
+        hits = blocked[cells[..., 1], cells[..., 0]]
+    else:
+        hits = blocked[env[:, None, None], cells[..., 1], cells[..., 0]]
+    return first_hit_distances(hits, max_dist, step)
+
+
+def cast_rays_chunked(occupancy, grid_size, positions, offsets, max_dist=MAX_DIST, step=STEP):
+    cells = ((positions[..., None, None, :] + offsets) // grid_size).astype(np.int64)
+    return first_hit_distances(occupancy.lookup(cells[..., 1], cells[..., 0]), max_dist, step)
@@ -0,0 +1,188 @@
+import numpy as np
+import torch
+
+
+class ReplayBuffer:
+    def __init__(self, capacity, state_size, seed=None):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+        self.position = 0
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+        self.batch = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.states, self.actions, self.rewards, self.next_states, self.dones))
+
+    def add(self, state, action, reward, next_state, done):
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        idx = (self.position + np.arange(len(actions))) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self.position = int(idx[-1] + 1) % self.capacity
+        self.size = min(self.size + len(actions), self.capacity)
+
+    def _batch_buffers(self, batch_size):
+        if self.batch is None or len(self.batch[1]) != batch_size:
+            arrays = (
+                np.empty((batch_size, self.state_size), dtype=np.float32),
+                np.empty(batch_size, dtype=np.int64),
+                np.empty(batch_size, dtype=np.float32),
+                np.empty((batch_size, self.state_size), dtype=np.float32),
+                np.empty(batch_size, dtype=np.float32),
+            )
+            self.batch = (arrays, tuple(torch.from_numpy(a) for a in arrays))
+        return self.batch
+
+    def gather(self, idx):
+        # The returned tensors share memory with reused batch buffers, so they
+        # are only valid until the next gather/sample call.
+        arrays, tensors = self._batch_buffers(len(idx))
+        np.take(self.states, idx, axis=0, out=arrays[0])
+        np.take(self.actions, idx, out=arrays[1])
+        np.take(self.rewards, idx, out=arrays[2])
+        np.take(self.next_states, idx, axis=0, out=arrays[3])
+        np.take(self.dones, idx, out=arrays[4])
+        return tensors
+
+    def sample(self, batch_size):
+        return self.gather(self.rng.integers(0, self.size, size=batch_size))
+
+    def state_dict(self):
+        n = self.size
+        return {
+            "states": self.states[:n].copy(),
+            "actions": self.actions[:n].copy(),
+            "rewards": self.rewards[:n].copy(),
+            "next_states": self.next_states[:n].copy(),
+            "dones": self.dones[:n].copy(),
+            "position": self.position,
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def load_state_dict(self, state):
+        n = len(state["actions"])
+        if n > self.capacity:
+            raise ValueError(f"Checkpoint holds {n} transitions, buffer capacity is {self.capacity}")
+        self.states[:n] = state["states"]
+        self.actions[:n] = state["actions"]
+        self.rewards[:n] = state["rewards"]
+        self.next_states[:n] = state["next_states"]
+        self.dones[:n] = state["dones"]
+        self.size = n
+        self.position = state["position"] % self.capacity
+        self.rng.bit_generator.state = state["rng"]
+
+
+class SumTree:
+    def __init__(self, capacity):
+        self.leaf_count = 1 << max(capacity - 1, 0).bit_length()
+        self.depth = self.leaf_count.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaf_count)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def priorities(self, idx):
+        return self.tree[idx + self.leaf_count]
+
+    def update_one(self, i, priority):
+        tree = self.tree
+        node = i + self.leaf_count
+        tree[node] = priority
+        node //= 2
+        while node >= 1:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
+
+    def update(self, idx, priorities):
+        tree = self.tree
+        nodes = np.asarray(idx) + self.leaf_count
+        tree[nodes] = priorities
+        # Duplicate parents are recomputed from their children, so they all write the same sum
+        for _ in range(self.depth):
+            nodes >>= 1
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
+
+    def find(self, values):
+        tree = self.tree
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = values.copy()
+        for _ in range(self.depth):
+            nodes <<= 1
+            left = tree[nodes]
+            go_right = values >= left
+            values -= left * go_right
+            nodes += go_right
+        return nodes - self.leaf_count
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, capacity, state_size, alpha=0.6, eps=1e-5, seed=None):
+        super().__init__(capacity, state_size, seed=seed)
+        self.alpha = alpha
+        self.eps = eps
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.weights = None
+
+    def add(self, state, action, reward, next_state, done):
+        i = self.position
+        super().add(state, action, reward, next_state, done)
+        self.tree.update_one(i, self.max_priority ** self.alpha)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        idx = (self.position + np.arange(len(actions))) % self.capacity
+        super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(idx, self.max_priority ** self.alpha)
+
+    def sample(self, batch_size, beta=0.4):
+        # Stratified sampling: one draw from each of batch_size equal slices of the total priority
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+
+        if self.weights is None or len(self.weights) != batch_size:
+            self.weights = np.empty(batch_size, dtype=np.float32)
+        probs = self.tree.priorities(idx) / self.tree.total
+        weights = (self.size * probs) ** -beta
+        np.divide(weights, weights.max(), out=self.weights, casting="unsafe")
+        return (*self.gather(idx), torch.from_numpy(self.weights), idx)
+
+    def state_dict(self):
+        state = super().state_dict()
+        state["priorities"] = self.tree.priorities(np.arange(self.size))
+        state["max_priority"] = self.max_priority
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self.tree.update(np.arange(self.size), state["priorities"])
+        self.max_priority = state["max_priority"]
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.tree.update(idx, priorities ** self.alpha)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
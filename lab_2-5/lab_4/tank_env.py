@@ -1,109 +1,207 @@
-import pygame
 import numpy as np
 import math
-import random
+from raycast import (ANGLE_STEP, MAX_DIST, STEP, cast_rays, cast_rays_chunked, padded_obstacles, ray_offset_table,
+                     ray_padding)
+
+RENDER_MODES = (None, "human", "rgb_array")
+# Where every episode starts; map generation keeps its cell free
+START_POS = (50, 50)
+
+# Per-heading tables indexed by tank_angle // ANGLE_STEP, so step() never calls into trig
+HEADINGS = range(0, 360, ANGLE_STEP)
+HEADING_RADIANS = [math.radians(angle) for angle in HEADINGS]
+MOVE_DX = [5 * math.cos(math.radians(angle)) for angle in HEADINGS]
+MOVE_DY = [5 * math.sin(math.radians(angle)) for angle in HEADINGS]
+
 
 class TankEnv:
-    def __init__(self, width=400, height=400, grid_size=40):
-        pygame.init()
+    def __init__(self, width=400, height=400, grid_size=40, render_mode=None, n_rays=4, seed=None,
+                 map_pool=None, tier=None, occupancy=None):
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render_mode: {render_mode!r}")
         self.width = width
         self.height = height
         self.grid_size = grid_size
         self.cols = width // grid_size
         self.rows = height // grid_size
-        self.screen = pygame.display.set_mode((width, height))
-        self.clock = pygame.time.Clock()
+        self.render_mode = render_mode
+        self.screen = None
+        self.clock = None
+        if render_mode == "human":
+            import pygame
+            pygame.init()
+            self.screen = pygame.display.set_mode((width, height))
+            self.clock = pygame.time.Clock()
+        self.frame = None
         self.tank_size = 20
         self.goal_size = 10
-        self.create_map()
+        self.n_rays = n_rays
+        self.ray_offsets = ray_offset_table(n_rays)
+        self.ray_pad = ray_padding(grid_size)
+        self.rng = np.random.default_rng(seed)
+        self.map_pool = map_pool
+        self.tier = tier
+        if map_pool is not None and (map_pool.grid_size, map_pool.rows, map_pool.cols) != (grid_size, self.rows, self.cols):
+            raise ValueError("Map pool was generated for a different world size")
+        self.allocate_buffers()
+        if occupancy is not None:
+            if occupancy.shape != (self.rows, self.cols):
+                raise ValueError("Occupancy map does not match the world size")
+            self.set_chunked_map(occupancy)
+        else:
+            self.create_map()
         self.reset()
 
+    def allocate_buffers(self):
+        # get_state() and step() work in these instead of allocating per call. Ray samples are kept
+        # as contiguous x/y planes: strided operands would make numpy allocate an iterator.
+        n_samples = self.ray_offsets.shape[2]
+        planes = np.ascontiguousarray(self.ray_offsets.transpose(3, 0, 1, 2))
+        self.heading_offsets_x = list(planes[0])
+        self.heading_offsets_y = list(planes[1])
+        self.ray_samples = np.empty((2, self.n_rays, n_samples))
+        self.ray_cells = np.empty((2, self.n_rays, n_samples), dtype=np.int64)
+        self.ray_index = np.empty((self.n_rays, n_samples), dtype=np.int64)
+        # One extra, always blocked sample per ray: argmax then finds the first hit, and a clear ray
+        # hits at n_samples, which is distance 1.0
+        self.ray_hits = np.ones((self.n_rays, n_samples + 1), dtype=np.uint8)
+        self.ray_first = np.empty(self.n_rays, dtype=np.int64)
+        self.padded_cols = self.cols + 2 * self.ray_pad
+        self.pad_offset = self.ray_pad * self.padded_cols + self.ray_pad
+        self.state_buffer = np.empty(6 + self.n_rays, dtype=np.float32)
+        self.new_pos = np.empty(2, dtype=np.float32)
+
+    @property
+    def goal_pos(self):
+        return self._goal_pos
+
+    @goal_pos.setter
+    def goal_pos(self, value):
+        self._goal_pos = np.asarray(value)
+        self.goal_xy = (float(self._goal_pos[0]), float(self._goal_pos[1]))
+
     def create_map(self):
-        self.map = np.zeros((self.rows, self.cols), dtype=int)
+        grid = np.zeros((self.rows, self.cols), dtype=int)
         for _ in range(30):
-            r, c = random.randint(0, self.rows - 1), random.randint(0, self.cols - 1)
-            self.map[r, c] = 1
+            r, c = self.rng.integers(self.rows), self.rng.integers(self.cols)
+            grid[r, c] = 1
+        grid[START_POS[1] // self.grid_size, START_POS[0] // self.grid_size] = 0
+        self.set_map(grid)
 
-    def reset(self):
-        self.tank_pos = np.array([50, 50], dtype=np.float32)
-        self.tank_angle = 0
+    def set_map(self, grid, blocked=None):
+        self.map = grid
+        self.blocked = padded_obstacles(grid, self.ray_pad) if blocked is None else blocked
+        self.free_cells = np.flatnonzero(grid.ravel() == 0)
+
+    def set_chunked_map(self, occupancy):
+        # Large worlds: collisions and rays query the tiles directly, nothing is stored per cell
+        self.map = occupancy
+        self.blocked = None
+        self.free_cells = None
+
+    def sample_free_cell(self):
+        if self.free_cells is not None:
+            return divmod(int(self.free_cells[self.rng.integers(len(self.free_cells))]), self.cols)
+        # One candidate at a time so a reset loads at most a tile or two of a sparse map
         while True:
-            x, y = random.randint(0, self.cols - 1), random.randint(0, self.rows - 1)
+            y, x = int(self.rng.integers(self.rows)), int(self.rng.integers(self.cols))
             if self.map[y, x] == 0:
-                self.goal_pos = np.array([x * self.grid_size + self.grid_size // 2,
-                                          y * self.grid_size + self.grid_size // 2])
-                break
+                return y, x
+
+    def reset(self):
+        self.tank_pos = np.array(START_POS, dtype=np.float32)
+        self.tank_angle = 0
+        if self.map_pool is not None:
+            map_ids, goal_cells = self.map_pool.sample(self.rng, 1, self.tier)
+            self.map = self.map_pool.maps[map_ids[0]]
+            self.blocked = self.map_pool.blocked[map_ids[0]]
+            self.goal_pos = self.map_pool.goal_positions(goal_cells)[0]
+        else:
+            y, x = self.sample_free_cell()
+            self.goal_pos = np.array([x * self.grid_size + self.grid_size // 2,
+                                      y * self.grid_size + self.grid_size // 2])
         self.done = False
         return self.get_state()
 
-    def raycast_distance(self, direction_vector):
-        max_dist = 100.0
-        step = 5
-        position = self.tank_pos.copy()
-        for i in range(int(max_dist / step)):
-            position += direction_vector * step
-            if not (0 <= position[0] < self.width and 0 <= position[1] < self.height):
-                return i * step / max_dist
-            grid_x, grid_y = int(position[0] // self.grid_size), int(position[1] // self.grid_size)
-            if self.map[grid_y, grid_x] == 1:
-                return i * step / max_dist
-        return 1.0
-
-    def get_state(self):
-        dist_to_goal = np.linalg.norm(self.tank_pos - self.goal_pos)
-        angle_to_goal = math.atan2(
-            self.goal_pos[1] - self.tank_pos[1],
-            self.goal_pos[0] - self.tank_pos[0]
-        ) - math.radians(self.tank_angle)
-
-        angle_rad = math.radians(self.tank_angle)
-        forward = np.array([math.cos(angle_rad), math.sin(angle_rad)])
-        backward = -forward
-        left = np.array([math.cos(angle_rad - math.pi / 2), math.sin(angle_rad - math.pi / 2)])
-        right = -left
-
-        sensors = [
-            self.raycast_distance(forward),
-            self.raycast_distance(backward),
-            self.raycast_distance(left),
-            self.raycast_distance(right),
-        ]
-
-        return np.array([
-            *self.tank_pos / self.width,
-            self.tank_angle / 360,
-            dist_to_goal / self.width,
-            math.sin(angle_to_goal),
-            math.cos(angle_to_goal),
-            *sensors
-        ], dtype=np.float32)
-
-    def step(self, action):
+    def state_dict(self):
+        dense = self.blocked is not None
+        return {"map": self.map.copy() if dense else None, "rng": self.rng.bit_generator.state}
+
+    def load_state_dict(self, state):
+        if state["map"] is not None:
+            self.set_map(np.array(state["map"]))
+        self.rng.bit_generator.state = state["rng"]
+
+    def get_state(self, out=None):
+        # Without `out` a fresh array is returned, since callers keep consecutive states around
+        x, y = self.tank_pos.tolist()
+        goal_x, goal_y = self.goal_xy
+        dx, dy = goal_x - x, goal_y - y
+        heading = self.tank_angle // ANGLE_STEP
+        angle_to_goal = math.atan2(dy, dx) - HEADING_RADIANS[heading]
+
+        state = self.state_buffer if out is None else out
+        state[0] = x / self.width
+        state[1] = y / self.width
+        state[2] = self.tank_angle / 360
+        state[3] = math.sqrt(dx * dx + dy * dy) / self.width
+        state[4] = math.sin(angle_to_goal)
+        state[5] = math.cos(angle_to_goal)
+        if self.blocked is None:
+            state[6:] = cast_rays_chunked(self.map, self.grid_size, self.tank_pos, self.ray_offsets[heading])
+        else:
+            state[6:] = self.cast_rays(x, y, heading)
+        return state.copy() if out is None else out
+
+    def cast_rays(self, x, y, heading):
+        # raycast.cast_rays for one tank, on the preallocated buffers. The padding holds every ray of
+        # a tank inside the world, so checking the position keeps all indices in range; take() raises
+        # rather than wraps if one ever is not.
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f"Tank position ({x}, {y}) is outside the world")
+        np.add(self.heading_offsets_x[heading], x, out=self.ray_samples[0])
+        np.add(self.heading_offsets_y[heading], y, out=self.ray_samples[1])
+        np.floor_divide(self.ray_samples, self.grid_size, out=self.ray_samples)
+        np.copyto(self.ray_cells, self.ray_samples, casting="unsafe")
+        np.multiply(self.ray_cells[1], self.padded_cols, out=self.ray_index)
+        np.add(self.ray_index, self.ray_cells[0], out=self.ray_index)
+        np.add(self.ray_index, self.pad_offset, out=self.ray_index)
+        self.blocked.reshape(-1).take(self.ray_index, out=self.ray_hits[:, :-1], mode="raise")
+        self.ray_hits.argmax(axis=1, out=self.ray_first)
+        return self.ray_first * (STEP / MAX_DIST)
+
+    def step(self, action, out=None):
         reward = -1
-        old_dist = np.linalg.norm(self.tank_pos - self.goal_pos)
-        new_pos = self.tank_pos.copy()
+        x, y = self.tank_pos.tolist()
+        goal_x, goal_y = self.goal_xy
+        old_dist = math.sqrt((x - goal_x) * (x - goal_x) + (y - goal_y) * (y - goal_y))
+        heading = self.tank_angle // ANGLE_STEP
+        new_x, new_y = x, y
 
         if action == 0:
-            dx = 5 * math.cos(math.radians(self.tank_angle))
-            dy = 5 * math.sin(math.radians(self.tank_angle))
-            new_pos += np.array([dx, dy])
+            new_x += MOVE_DX[heading]
+            new_y += MOVE_DY[heading]
         elif action == 1:
-            dx = -5 * math.cos(math.radians(self.tank_angle))
-            dy = -5 * math.sin(math.radians(self.tank_angle))
-            new_pos += np.array([dx, dy])
+            new_x -= MOVE_DX[heading]
+            new_y -= MOVE_DY[heading]
         elif action == 2:
-            self.tank_angle = (self.tank_angle - 10) % 360
+            self.tank_angle = (self.tank_angle - ANGLE_STEP) % 360
         elif action == 3:
-            self.tank_angle = (self.tank_angle + 10) % 360
+            self.tank_angle = (self.tank_angle + ANGLE_STEP) % 360
         elif action == 4:
             if old_dist < 20:
                 reward = 100
                 self.done = True
 
-        if 0 <= new_pos[0] < self.width and 0 <= new_pos[1] < self.height:
-            grid_x, grid_y = int(new_pos[0] // self.grid_size), int(new_pos[1] // self.grid_size)
+        # Round through float32 storage so the bounds/collision checks see the stored position
+        self.new_pos[0], self.new_pos[1] = new_x, new_y
+        new_x, new_y = self.new_pos.tolist()
+
+        if 0 <= new_x < self.width and 0 <= new_y < self.height:
+            grid_x, grid_y = int(new_x // self.grid_size), int(new_y // self.grid_size)
             if self.map[grid_y, grid_x] == 0:
-                self.tank_pos = new_pos
+                self.tank_pos[:] = self.new_pos
+                x, y = new_x, new_y
             else:
                 reward = -10
                 self.done = True
@@ -112,15 +210,41 @@ class TankEnv:
             self.done = True
 
         if not self.done:
-            new_dist = np.linalg.norm(self.tank_pos - self.goal_pos)
+            new_dist = math.sqrt((x - goal_x) * (x - goal_x) + (y - goal_y) * (y - goal_y))
             if new_dist < old_dist:
                 reward += 10
             else:
                 reward -= 5
 
-        return self.get_state(), reward, self.done, {}
+        return self.get_state(out), reward, self.done, {}
+
+    def render_array(self):
+        if self.blocked is None:
+            raise ValueError("Rendering needs a dense map")
+        if self.frame is None:
+            self.frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        frame = self.frame
+        frame[:] = 255
+
+        cells = np.repeat(np.repeat(self.map == 1, self.grid_size, axis=0), self.grid_size, axis=1)
+        frame[:cells.shape[0], :cells.shape[1]][cells] = (100, 100, 100)
+
+        ys, xs = np.ogrid[:self.height, :self.width]
+        goal_x, goal_y = self.goal_pos.astype(int)
+        goal = (xs - goal_x) ** 2 + (ys - goal_y) ** 2 <= self.goal_size ** 2
+        frame[goal] = (0, 255, 0)
+
+        x0, y0 = (self.tank_pos - self.tank_size // 2).astype(int)
+        frame[max(y0, 0):max(y0 + self.tank_size, 0), max(x0, 0):max(x0 + self.tank_size, 0)] = (0, 0, 255)
+        return frame
 
     def render(self):
+        if self.render_mode == "rgb_array":
+            return self.render_array().copy()
+        if self.render_mode != "human":
+            return None
+
+        import pygame
         self.screen.fill((255, 255, 255))
 
         for y in range(self.rows):
@@ -142,10 +266,134 @@ class TankEnv:
         self.clock.tick(30)
 
     def close(self):
-        pygame.quit()
+        if self.screen is not None:
+            import pygame
+            pygame.quit()
+            self.screen = None
+
+class VecTankEnv:
+    def __init__(self, num_envs=16, width=400, height=400, grid_size=40, max_steps=200, seed=None, n_rays=4,
+                 map_pool=None, tier=None):
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.grid_size = grid_size
+        self.cols = width // grid_size
+        self.rows = height // grid_size
+        self.max_steps = max_steps
+        self.tank_size = 20
+        self.goal_size = 10
+        self.n_rays = n_rays
+        self.ray_offsets = ray_offset_table(n_rays)
+        self.ray_pad = ray_padding(grid_size)
+        self.rng = np.random.default_rng(seed)
+        self.map_pool = map_pool
+        self.tier = tier
+        if map_pool is not None and (map_pool.grid_size, map_pool.rows, map_pool.cols) != (grid_size, self.rows, self.cols):
+            raise ValueError("Map pool was generated for a different world size")
+        self.env_index = np.arange(num_envs)
+        self.tank_pos = np.zeros((num_envs, 2), dtype=np.float32)
+        self.tank_angle = np.zeros(num_envs, dtype=np.int64)
+        self.goal_pos = np.zeros((num_envs, 2), dtype=np.int64)
+        self.done = np.zeros(num_envs, dtype=bool)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.create_maps()
+        self.reset()
+
+    def create_maps(self):
+        self.maps = np.zeros((self.num_envs, self.rows, self.cols), dtype=np.int64)
+        r = self.rng.integers(0, self.rows, size=(self.num_envs, 30))
+        c = self.rng.integers(0, self.cols, size=(self.num_envs, 30))
+        self.maps[self.env_index[:, None], r, c] = 1
+        self.maps[:, START_POS[1] // self.grid_size, START_POS[0] // self.grid_size] = 0
+        self.blocked = padded_obstacles(self.maps, self.ray_pad)
+
+    def reset_envs(self, idx):
+        self.tank_pos[idx] = START_POS
+        self.tank_angle[idx] = 0
+        self.steps[idx] = 0
+        self.done[idx] = False
+        if self.map_pool is not None:
+            map_ids, goal_cells = self.map_pool.sample(self.rng, len(idx), self.tier)
+            self.maps[idx] = self.map_pool.maps[map_ids]
+            self.blocked[idx] = self.map_pool.blocked[map_ids]
+            self.goal_pos[idx] = self.map_pool.goal_positions(goal_cells)
+            return
+        keys = self.rng.random((len(idx), self.rows * self.cols))
+        keys[self.maps[idx].reshape(len(idx), -1) == 1] = -1.0
+        cell = np.argmax(keys, axis=1)
+        y, x = np.divmod(cell, self.cols)
+        self.goal_pos[idx, 0] = x * self.grid_size + self.grid_size // 2
+        self.goal_pos[idx, 1] = y * self.grid_size + self.grid_size // 2
+
+    def reset(self):
+        self.reset_envs(self.env_index)
+        return self.get_state()
+
+    def get_state(self, idx=None):
+        if idx is None:
+            idx = self.env_index
+        tank_pos = self.tank_pos[idx]
+        delta = self.goal_pos[idx] - tank_pos
+        dist_to_goal = np.hypot(delta[:, 0], delta[:, 1])
+        angle_to_goal = np.arctan2(delta[:, 1], delta[:, 0]) - np.radians(self.tank_angle[idx])
+
+        state = np.empty((len(idx), 6 + self.n_rays), dtype=np.float32)
+        state[:, 0:2] = tank_pos / self.width
+        state[:, 2] = self.tank_angle[idx] / 360
+        state[:, 3] = dist_to_goal / self.width
+        state[:, 4] = np.sin(angle_to_goal)
+        state[:, 5] = np.cos(angle_to_goal)
+        state[:, 6:] = cast_rays(
+            self.blocked, self.ray_pad, self.grid_size,
+            tank_pos, self.ray_offsets[self.tank_angle[idx] // ANGLE_STEP], env=idx
+        )
+        return state
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        rewards = np.full(self.num_envs, -1.0, dtype=np.float32)
+        old_dist = np.linalg.norm(self.tank_pos - self.goal_pos, axis=1)
+
+        angle_rad = np.radians(self.tank_angle)
+        speed = np.where(actions == 0, 5.0, np.where(actions == 1, -5.0, 0.0))
+        new_pos = (self.tank_pos + speed[:, None] * np.stack([np.cos(angle_rad), np.sin(angle_rad)], axis=1)).astype(np.float32)
+        self.tank_angle = np.where(actions == 2, (self.tank_angle - 10) % 360, self.tank_angle)
+        self.tank_angle = np.where(actions == 3, (self.tank_angle + 10) % 360, self.tank_angle)
+
+        reached = (actions == 4) & (old_dist < 20)
+        rewards[reached] = 100
+        self.done |= reached
+
+        inside = (new_pos[:, 0] >= 0) & (new_pos[:, 0] < self.width) & (new_pos[:, 1] >= 0) & (new_pos[:, 1] < self.height)
+        grid_x = np.clip(new_pos[:, 0] // self.grid_size, 0, self.cols - 1).astype(np.int64)
+        grid_y = np.clip(new_pos[:, 1] // self.grid_size, 0, self.rows - 1).astype(np.int64)
+        free = inside & (self.maps[self.env_index, grid_y, grid_x] == 0)
+        self.tank_pos[free] = new_pos[free]
+        rewards[~free] = -10
+        self.done |= ~free
+
+        new_dist = np.linalg.norm(self.tank_pos - self.goal_pos, axis=1)
+        shaping = np.where(new_dist < old_dist, 10, -5)
+        rewards[~self.done] += shaping[~self.done]
+
+        self.steps += 1
+        dones = self.done.copy()
+        truncated = ~dones & (self.steps >= self.max_steps)
+        state = self.get_state()
+        info = {"final_state": state, "truncated": truncated}
+        finished = np.flatnonzero(dones | truncated)
+        if len(finished):
+            self.reset_envs(finished)
+            state = state.copy()
+            state[finished] = self.get_state(finished)
+        return state, rewards, dones, info
+
 
 if __name__ == "__main__":
-    env = TankEnv()
+    import pygame
+
+    env = TankEnv(render_mode="human")
     state = env.reset()
 
     running = True
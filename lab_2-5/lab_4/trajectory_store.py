@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import numpy as np
+
+FIELDS = ("states", "actions", "rewards", "dones", "episodes")
+META = "meta.json"
+
+
+def field_layout(state_size):
+    return {
+        "states": (np.float32, (state_size,)),
+        "actions": (np.uint8, ()),
+        "rewards": (np.float32, ()),
+        "dones": (np.bool_, ()),
+        "episodes": (np.int64, ()),
+    }
+
+
+def chunk_path(path, chunk, field):
+    return os.path.join(path, f"{chunk:06d}_{field}.npy")
+
+
+def read_meta(path):
+    with open(os.path.join(path, META)) as f:
+        return json.load(f)
+
+
+class TrajectoryWriter:
+    # Append-only per-step log split into fixed-size .npy chunks. Only the current chunk is mapped,
+    # so memory stays bounded however long the run is. meta.json is the commit point: readers never
+    # look past its length, and it is replaced atomically.
+    def __init__(self, path, state_size, chunk_size=1 << 20, commit_every=4096):
+        self.path = path
+        self.commit_every = commit_every
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, META)):
+            meta = read_meta(path)
+            if meta["state_size"] != state_size:
+                raise ValueError(f"{path} holds states of size {meta['state_size']}, not {state_size}")
+            self.chunk_size = meta["chunk_size"]
+            self.length = meta["length"]
+            self.next_episode = meta["next_episode"]
+        else:
+            self.chunk_size = chunk_size
+            self.length = 0
+            self.next_episode = 0
+        self.state_size = state_size
+        self.layout = field_layout(state_size)
+        self.committed = self.length
+        self.chunk = None
+        self.arrays = None
+        self.commit()
+
+    def _map_chunk(self, chunk):
+        if self.arrays is not None:
+            for array in self.arrays.values():
+                array.flush()
+        self.arrays = {}
+        for field, (dtype, shape) in self.layout.items():
+            file = chunk_path(self.path, chunk, field)
+            if os.path.exists(file):
+                self.arrays[field] = np.load(file, mmap_mode="r+")
+            else:
+                self.arrays[field] = np.lib.format.open_memmap(file, mode="w+", dtype=dtype,
+                                                               shape=(self.chunk_size, *shape))
+        self.chunk = chunk
+
+    def new_episode(self):
+        self.next_episode += 1
+        return self.next_episode - 1
+
+    def new_episodes(self, n):
+        self.next_episode += n
+        return np.arange(self.next_episode - n, self.next_episode)
+
+    def truncate(self, length, next_episode):
+        # Drops steps logged after a checkpoint so a resumed run does not log them twice
+        if length > self.length:
+            raise ValueError(f"Cannot truncate {self.path} to {length} rows, it only has {self.length}")
+        self.length = length
+        self.next_episode = next_episode
+        self.commit()
+
+    def append(self, state, action, reward, done, episode):
+        chunk, row = divmod(self.length, self.chunk_size)
+        if chunk != self.chunk:
+            self._map_chunk(chunk)
+        arrays = self.arrays
+        arrays["states"][row] = state
+        arrays["actions"][row] = action
+        arrays["rewards"][row] = reward
+        arrays["dones"][row] = done
+        arrays["episodes"][row] = episode
+        self.length += 1
+        if self.length - self.committed >= self.commit_every:
+            self.commit()
+
+    def append_batch(self, states, actions, rewards, dones, episodes):
+        n = len(actions)
+        written = 0
+        while written < n:
+            chunk, row = divmod(self.length, self.chunk_size)
+            if chunk != self.chunk:
+                self._map_chunk(chunk)
+            count = min(n - written, self.chunk_size - row)
+            rows = slice(row, row + count)
+            part = slice(written, written + count)
+            self.arrays["states"][rows] = states[part]
+            self.arrays["actions"][rows] = actions[part]
+            self.arrays["rewards"][rows] = rewards[part]
+            self.arrays["dones"][rows] = dones[part]
+            self.arrays["episodes"][rows] = episodes[part]
+            self.length += count
+            written += count
+        if self.length - self.committed >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        if self.arrays is not None:
+            for array in self.arrays.values():
+                array.flush()
+        meta = {"state_size": self.state_size, "chunk_size": self.chunk_size, "length": self.length,
+                "next_episode": self.next_episode}
+        tmp_path = os.path.join(self.path, f"{META}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META))
+        self.committed = self.length
+
+    def close(self):
+        self.commit()
+        self.arrays = None
+        self.chunk = None
+
+
+class TrajectoryReader:
+    # Zero-copy view of a store, safe to open while a writer is still appending; refresh() picks up
+    # whatever has been committed since
+    def __init__(self, path):
+        self.path = path
+        self.chunks = []
+        self.refresh()
+
+    def refresh(self):
+        meta = read_meta(self.path)
+        self.state_size = meta["state_size"]
+        self.chunk_size = meta["chunk_size"]
+        self.length = meta["length"]
+        num_chunks = -(-self.length // self.chunk_size)
+        for chunk in range(len(self.chunks), num_chunks):
+            self.chunks.append({field: np.load(chunk_path(self.path, chunk, field), mmap_mode="r")
+                                for field in FIELDS})
+        return self.length
+
+    def __len__(self):
+        return self.length
+
+    def iter_chunks(self, start=0, stop=None):
+        # Yields (offset, {field: view}) over committed rows without copying
+        stop = self.length if stop is None else min(stop, self.length)
+        for chunk in range(start // self.chunk_size, -(-stop // self.chunk_size)):
+            offset = chunk * self.chunk_size
+            lo, hi = max(start - offset, 0), min(stop - offset, self.chunk_size)
+            yield offset + lo, {field: array[lo:hi] for field, array in self.chunks[chunk].items()}
+
+    def read(self, field, start=0, stop=None):
+        # Copies a row range into one contiguous array
+        parts = [views[field] for _, views in self.iter_chunks(start, stop)]
+        if not parts:
+            dtype, shape = field_layout(self.state_size)[field]
+            return np.empty((0, *shape), dtype=dtype)
+        return np.concatenate(parts)
+
+    def episode_returns(self):
+        # Total reward per episode id, accumulated chunk by chunk
+        totals = np.zeros(0)
+        for _, views in self.iter_chunks():
+            counts = np.bincount(views["episodes"], weights=views["rewards"])
+            if len(counts) > len(totals):
+                totals = np.pad(totals, (0, len(counts) - len(totals)))
+            totals[:len(counts)] += counts
+        return totals
+
+    def transitions(self, start=0, stop=None):
+        # (state, action, reward, next_state, done) for rows in [start, stop). Vectorized runs interleave
+        # episodes, so rows are grouped by episode (stably, keeping step order) and next_state is the
+        # episode's following row. A step whose successor falls outside the range, like the last step
+        # of an episode cut off by a timeout, has no next state and is dropped.
+        episodes = self.read("episodes", start, stop)
+        order = np.argsort(episodes, kind="stable")
+        episodes = episodes[order]
+        states = self.read("states", start, stop)[order]
+        dones = self.read("dones", start, stop)[order]
+        has_next = np.zeros(len(order), dtype=bool)
+        has_next[:-1] = episodes[1:] == episodes[:-1]
+        next_states = states.copy()
+        next_states[:-1][has_next[:-1]] = states[1:][has_next[:-1]]
+        keep = dones | has_next
+        return (states[keep], self.read("actions", start, stop)[order][keep],
+                self.read("rewards", start, stop)[order][keep], next_states[keep], dones[keep])
+
+
+def fill_replay(memory, reader, limit=None, block=1 << 18):
+    # Seeds a replay buffer with the most recent transitions of a store
+    limit = memory.capacity if limit is None else limit
+    added = 0
+    for start in range(max(len(reader) - limit, 0), len(reader), block):
+        states, actions, rewards, next_states, dones = reader.transitions(start, start + block)
+        if len(actions):
+            memory.add_batch(states, actions.astype(np.int64), rewards, next_states, dones)
+            added += len(actions)
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--last", type=int, default=10, help="print the returns of the last N episodes")
+    args = parser.parse_args()
+
+    reader = TrajectoryReader(args.path)
+    returns = reader.episode_returns()
+    print(f"{len(reader)} steps, {len(returns)} episodes, {len(reader.chunks)} chunks of {reader.chunk_size}")
+    for episode in range(max(len(returns) - args.last, 0), len(returns)):
+        print(f"episode {episode:>8} return {returns[episode]:.1f}")
@@ -1,6 +1,7 @@
 ﻿using System;
 using System.Diagnostics;
 using System.IO;
+using System.Text;
 using System.Text.Json;
 
 class Program
@@ -19,7 +20,10 @@ class Program
 
         using (var process = Process.Start(psi))
         {
-            process.StandardInput.Write(csvData);
+            if (csvData != null)
+            {
+                process.StandardInput.Write(csvData);
+            }
             process.StandardInput.Close();
 
             string output = process.StandardOutput.ReadToEnd();
@@ -29,13 +33,7 @@ class Program
             Console.WriteLine($"▶ {Path.GetFileName(scriptPath)} завершён:");
             if (!string.IsNullOrEmpty(output))
             {
-                var json = System.Text.Json.JsonDocument.Parse(output.Trim());
-                string model = json.RootElement.GetProperty("model").GetString();
-                double acc = json.RootElement.GetProperty("accuracy").GetDouble();
-                double time = json.RootElement.GetProperty("time").GetDouble();
-                Console.WriteLine($"  Модель: {model}");
-                Console.WriteLine($"  Accuracy: {acc:F4}");
-                Console.WriteLine($"  Time: {time:F2} сек.");
+                PrintResult(output.Trim());
             }
 
             if (!string.IsNullOrEmpty(error))
@@ -45,20 +43,174 @@ class Program
         }
     }
 
+    static void PrintResult(string line)
+    {
+        var json = JsonDocument.Parse(line);
+        if (json.RootElement.TryGetProperty("error", out var failure))
+        {
+            Console.WriteLine("Ошибки:\n" + failure.GetString());
+            return;
+        }
+        string model = json.RootElement.GetProperty("model").GetString();
+        double acc = json.RootElement.GetProperty("accuracy").GetDouble();
+        double time = json.RootElement.GetProperty("time").GetDouble();
+        Console.WriteLine($"  Модель: {model}");
+        Console.WriteLine($"  Accuracy: {acc:F4}");
+        Console.WriteLine($"  Time: {time:F2} сек.");
+        if (json.RootElement.TryGetProperty("timings", out var timings))
+        {
+            var phases = timings.EnumerateObject().Select(p => $"{p.Name} {p.Value.GetDouble():F3}");
+            Console.WriteLine($"  Этапы: {string.Join(", ", phases)} сек.");
+        }
+        if (json.RootElement.TryGetProperty("cached", out var cached) && cached.GetBoolean())
+        {
+            Console.WriteLine("  (результат из кэша)");
+        }
+    }
+
+    // One long-lived python3 process (scripts/server.py) imports pandas/sklearn/xgboost once and
+    // answers a JSON line per script, so each run pays only for the fit itself
+    static void RunWithServer(string[] scripts, string dataPath, string extraArgs, bool binary)
+    {
+        var psi = new ProcessStartInfo
+        {
+            FileName = "python3",
+            Arguments = "scripts/server.py" + extraArgs,
+            RedirectStandardOutput = true,
+            RedirectStandardError = true,
+            RedirectStandardInput = true,
+            UseShellExecute = false
+        };
+
+        using (var server = Process.Start(psi))
+        {
+            var errors = new StringBuilder();
+            server.ErrorDataReceived += (_, e) =>
+            {
+                if (e.Data != null)
+                    lock (errors) errors.AppendLine(e.Data);
+            };
+            server.BeginErrorReadLine();
+
+            int id = 0;
+            foreach (var script in scripts)
+            {
+                // "dataset" makes the server memory-map the data from its binary cache instead of
+                // reading the CSV text
+                var request = JsonSerializer.Serialize(new Dictionary<string, object>
+                {
+                    ["id"] = ++id,
+                    ["script"] = Path.GetFileNameWithoutExtension(script),
+                    [binary ? "dataset" : "path"] = Path.GetFullPath(dataPath)
+                });
+                server.StandardInput.WriteLine(request);
+                server.StandardInput.Flush();
+                string? response = server.StandardOutput.ReadLine();
+
+                Console.WriteLine($"▶ {Path.GetFileName(script)} завершён:");
+                if (response != null)
+                {
+                    PrintResult(response);
+                }
+                lock (errors)
+                {
+                    if (errors.Length > 0)
+                    {
+                        Console.WriteLine("Ошибки:\n" + errors);
+                        errors.Clear();
+                    }
+                }
+                if (response == null)
+                {
+                    break;
+                }
+            }
+
+            server.StandardInput.Close();
+            server.WaitForExit();
+            if (errors.Length > 0)
+            {
+                Console.WriteLine("Ошибки:\n" + errors);
+            }
+        }
+    }
+
 
-    static void Main()
+    // scripts/run_all.py parses and encodes the CSV once and fits all six models in a forked
+    // process pool; it prints one JSON line per model as each finishes
+    // With csvData == null run_all.py is given the path and memory-maps the data instead
+    static void RunParallel(string? csvData, string dataPath, string extraArgs)
     {
-        string csvData = File.ReadAllText("input/data.csv");
+        var psi = new ProcessStartInfo
+        {
+            FileName = "python3",
+            Arguments = "scripts/run_all.py" + extraArgs + (csvData == null ? $" --data \"{dataPath}\"" : ""),
+            RedirectStandardOutput = true,
+            RedirectStandardError = true,
+            RedirectStandardInput = true,
+            UseShellExecute = false
+        };
+
+        using (var process = Process.Start(psi))
+        {
+            var errors = new StringBuilder();
+            process.ErrorDataReceived += (_, e) =>
+            {
+                if (e.Data != null)
+                    lock (errors) errors.AppendLine(e.Data);
+            };
+            process.BeginErrorReadLine();
+            if (csvData != null)
+            {
+                process.StandardInput.Write(csvData);
+            }
+            process.StandardInput.Close();
 
+            string? line;
+            while ((line = process.StandardOutput.ReadLine()) != null)
+            {
+                var json = JsonDocument.Parse(line);
+                Console.WriteLine($"▶ {json.RootElement.GetProperty("script").GetString()}.py завершён:");
+                PrintResult(line);
+            }
+            process.WaitForExit();
+
+            if (errors.Length > 0)
+            {
+                Console.WriteLine("Ошибки:\n" + errors);
+            }
+        }
+    }
+
+
+    static void Main(string[] args)
+    {
         string[] scripts = {
             "scripts/script1.py", "scripts/script2.py", "scripts/script3.py",
             "scripts/script4.py", "scripts/script5.py", "scripts/script6.py"
         };
 
-        foreach (var script in scripts)
+        if (args.Contains("--per-process"))
+        {
+            string csvData = File.ReadAllText("input/data.csv");
+            foreach (var script in scripts)
+            {
+                RunScript(script, csvData);
+            }
+            return;
+        }
+        // --cache answers scripts already fitted on the same data.csv from scripts' fitted-pipeline cache
+        string extraArgs = args.Contains("--cache") ? " --cache .artifact_cache" : "";
+        // --binary passes the data by path: Python memory-maps it from a columnar cache built once per
+        // file content, so the CSV text is neither piped nor re-parsed
+        bool binary = args.Contains("--binary");
+        if (args.Contains("--parallel"))
         {
-            RunScript(script, csvData);
+            RunParallel(binary ? null : File.ReadAllText("input/data.csv"), "input/data.csv", extraArgs);
+            return;
         }
+
+        RunWithServer(scripts, "input/data.csv", extraArgs, binary);
     }
 
     class ModelResult
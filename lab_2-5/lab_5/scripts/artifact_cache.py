@@ -0,0 +1,116 @@
+import argparse
+import hashlib
+import json
+import os
+
+# Fitted encoder+model pipelines, one joblib file per key, with their metrics in a JSON file next
+# to it so a hit can be answered without unpickling (or importing) anything. The key covers
+# everything the fit depends on. Reading an entry refreshes its mtime, and eviction drops the
+# least recently used entries first.
+CACHE_DIR = ".artifact_cache"
+DEFAULT_BUDGET = 1 << 30
+
+
+def artifact_key(dataset_hash, model_class, library_version, params, split_seed, test_size):
+    # The library version is part of the key since pickles are only trusted by the version that wrote them
+    description = {
+        "dataset": dataset_hash,
+        "class": model_class,
+        "version": library_version,
+        "params": params,
+        "split_seed": split_seed,
+        "test_size": test_size,
+    }
+    text = json.dumps(description, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+class ArtifactCache:
+    def __init__(self, path=CACHE_DIR, budget=DEFAULT_BUDGET):
+        self.path = path
+        self.budget = budget
+        os.makedirs(path, exist_ok=True)
+
+    def file(self, key, suffix=".joblib"):
+        return os.path.join(self.path, f"{key}{suffix}")
+
+    def metrics(self, key):
+        # Returns the stored metrics dict or None, without loading the fitted objects
+        try:
+            with open(self.file(key, ".json")) as f:
+                metrics = json.load(f)
+            os.utime(self.file(key))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return metrics
+
+    def get(self, key):
+        # Returns {"encoder", "model", "metrics"} or None
+        import joblib
+        file = self.file(key)
+        try:
+            artifact = joblib.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A truncated or incompatible entry is treated as a miss and replaced on the next put
+            return None
+        os.utime(file)
+        return artifact
+
+    def put(self, key, encoder, model, metrics):
+        # The pipeline is written before the metrics, so metrics on disk always have a pipeline behind them
+        import joblib
+        file = self.file(key)
+        tmp_file = f"{file}.{os.getpid()}.tmp"
+        joblib.dump({"encoder": encoder, "model": model, "metrics": metrics}, tmp_file)
+        os.replace(tmp_file, file)
+
+        file = self.file(key, ".json")
+        tmp_file = f"{file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(metrics, f)
+        os.replace(tmp_file, file)
+
+    def entries(self):
+        # (mtime, size, file) of every entry, least recently used first
+        found = []
+        for name in os.listdir(self.path):
+            if name.endswith(".joblib"):
+                file = os.path.join(self.path, name)
+                try:
+                    stat = os.stat(file)
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime_ns, stat.st_size, file))
+        return sorted(found)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, file in entries:
+            if total <= self.budget:
+                break
+            for path in (file, file[:-len(".joblib")] + ".json"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or trim the fitted-pipeline cache")
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--budget-mb", type=float, default=DEFAULT_BUDGET / 2 ** 20)
+    parser.add_argument("--evict", action="store_true", help="remove least recently used entries over budget")
+    args = parser.parse_args()
+
+    cache = ArtifactCache(args.cache, int(args.budget_mb * 2 ** 20))
+    if args.evict:
+        print(f"removed {cache.evict()} entries")
+    entries = cache.entries()
+    print(f"{len(entries)} entries, {sum(size for _, size, _ in entries) / 2 ** 20:.1f} MB in {args.cache}")
@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+# A CSV is converted once into one .npy file per column under <cache_dir>/<content hash>/:
+# string columns become integer codes (categories listed in meta.json, -1 for missing), float
+# columns float32 and integer columns the smallest integer type that holds them. Later loads
+# memory-map the columns instead of parsing text.
+CACHE_DIR = ".dataset_cache"
+SOURCES = "sources.json"
+META = "meta.json"
+
+
+def default_cache_dir(csv_path):
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR)
+
+
+def content_hash(csv_path):
+    with open(csv_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()[:32]
+
+
+def read_json(path, default=None):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_json(path, value):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+def source_key(csv_path, cache_dir):
+    # Hashing a multi-GB file costs seconds, so the hash is only recomputed when size or mtime change
+    csv_path = os.path.abspath(csv_path)
+    stat = os.stat(csv_path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    sources_path = os.path.join(cache_dir, SOURCES)
+    sources = read_json(sources_path, {})
+    known = sources.get(csv_path)
+    if known is not None and known[:2] == stamp:
+        return known[2]
+    digest = content_hash(csv_path)
+    sources = read_json(sources_path, {})
+    sources[csv_path] = stamp + [digest]
+    write_json(sources_path, sources)
+    return digest
+
+
+def smallest_int(values):
+    if len(values) == 0:
+        return np.int8
+    lo, hi = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+
+def convert(csv_path, entry_dir):
+    data = pd.read_csv(csv_path)
+    tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    columns = []
+    for i, name in enumerate(data.columns):
+        series = data[name]
+        if pd.api.types.is_bool_dtype(series):
+            kind, values, categories = "int", series.to_numpy(np.int8), None
+        elif pd.api.types.is_integer_dtype(series):
+            values = series.to_numpy()
+            kind, values, categories = "int", values.astype(smallest_int(values)), None
+        elif pd.api.types.is_float_dtype(series):
+            kind, values, categories = "float", series.to_numpy(np.float32), None
+        else:
+            if series.dtype == object:
+                series = series.astype(str).where(series.notna())
+            codes, uniques = pd.factorize(series, sort=True)
+            kind, categories = "category", uniques.tolist()
+            values = codes.astype(smallest_int(np.array([-1, len(categories)])))
+        np.save(os.path.join(tmp_dir, f"{i}.npy"), values)
+        columns.append({"name": name, "kind": kind, "categories": categories})
+    write_json(os.path.join(tmp_dir, META), {"rows": len(data), "columns": columns})
+    try:
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        # Another process converted the same content first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def dataset_hash(csv_path, cache_dir=None):
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    return source_key(csv_path, cache_dir)
+
+
+def load_columns(csv_path, cache_dir=None):
+    # Returns (meta, [array per column]) with every array memory-mapped read-only
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    entry_dir = os.path.join(cache_dir, dataset_hash(csv_path, cache_dir))
+    meta = read_json(os.path.join(entry_dir, META))
+    if meta is None:
+        convert(csv_path, entry_dir)
+        meta = read_json(os.path.join(entry_dir, META))
+    arrays = [np.load(os.path.join(entry_dir, f"{i}.npy"), mmap_mode="r") for i in range(len(meta["columns"]))]
+    return meta, arrays
+
+
+def read_dataset(csv_path, cache_dir=None):
+    # Drop-in for pd.read_csv(csv_path): string columns come back as pandas categoricals
+    meta, arrays = load_columns(csv_path, cache_dir)
+    frame = {}
+    for column, values in zip(meta["columns"], arrays):
+        if column["kind"] == "category":
+            frame[column["name"]] = pd.Categorical.from_codes(values, column["categories"])
+        else:
+            frame[column["name"]] = values
+    return pd.DataFrame(frame, copy=False)
+
+
+def prune(cache_dir):
+    # Removes entries no longer referenced by any source
+    sources = read_json(os.path.join(cache_dir, SOURCES), {})
+    live = {digest for _, _, digest in sources.values()}
+    removed = 0
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.isdir(path) and name not in live:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert CSV files into the memory-mapped dataset cache")
+    parser.add_argument("csv", nargs="+")
+    parser.add_argument("--cache-dir", default=None, help="default: .dataset_cache next to each CSV")
+    parser.add_argument("--prune", action="store_true", help="delete cache entries of CSVs that have changed")
+    args = parser.parse_args()
+
+    cache_dirs = set()
+    for path in args.csv:
+        start = time.perf_counter()
+        meta, _ = load_columns(path, args.cache_dir)
+        print(f"{path}: {meta['rows']} rows, {len(meta['columns'])} columns, {time.perf_counter() - start:.3f} s")
+        cache_dirs.add(args.cache_dir or default_cache_dir(path))
+    if args.prune:
+        for cache_dir in cache_dirs:
+            print(f"{cache_dir}: removed {prune(cache_dir)} stale entries")
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+# Ranks of the *_ordinal columns of the collision datasets
+ORDINAL_LEVELS = {"Low": 0, "Medium-Low": 1, "Medium": 2, "Medium-High": 3, "High": 4}
+# Rank of missing or unknown levels
+UNKNOWN_RANK = 2.0
+
+
+def smoothed(sums, counts, prior, min_samples_leaf, smoothing):
+    # category_encoders.TargetEncoder's blend of each category mean with the prior, weighted by a
+    # sigmoid of the category's count; unseen categories get the prior
+    weight = 1 / (1 + np.exp(-(counts - min_samples_leaf) / smoothing))
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    return np.where(counts > 0, prior * (1 - weight) + means * weight, prior)
+
+
+class FastTargetEncoder:
+    # Drop-in for category_encoders.TargetEncoder on the collision data, built on pd.factorize codes
+    # and np.bincount sums, returning a dense float32 matrix in the input's column order:
+    #   - *_ordinal columns whose values are all ORDINAL_LEVELS become their rank 0..4
+    #   - other non-numeric columns (and any in cols) are target-encoded
+    #   - numeric columns pass through
+    # fit_transform encodes each training row out of fold, from statistics of the other folds only,
+    # so a row's own label never leaks into its feature; transform uses statistics of all rows.
+    def __init__(self, cols=None, folds=5, min_samples_leaf=20, smoothing=10.0, seed=42):
+        self.cols = cols
+        self.folds = folds
+        self.min_samples_leaf = min_samples_leaf
+        self.smoothing = smoothing
+        self.seed = seed
+
+    def fit(self, X, y):
+        self.fit_transform(X, y)
+        return self
+
+    def fit_transform(self, X, y):
+        y = np.asarray(y, dtype=np.float64)
+        n = len(y)
+        self.feature_names_in_ = list(X.columns)
+        self.prior_ = float(y.mean()) if n else 0.0
+        self.kinds_ = {}
+        self.categories_ = {}
+        self.tables_ = {}
+        # Filled one contiguous column at a time and returned transposed, i.e. Fortran-ordered
+        out = np.empty((len(self.feature_names_in_), n), dtype=np.float32)
+
+        k = max(min(self.folds, n), 1)
+        fold = np.random.default_rng(self.seed).permutation(n) % k
+        fold_sums = np.bincount(fold, weights=y, minlength=k)
+        fold_counts = np.bincount(fold, minlength=k)
+        # Prior of each fold from the other folds' rows
+        fold_priors = (y.sum() - fold_sums) / np.maximum(n - fold_counts, 1)
+
+        for j, column in enumerate(self.feature_names_in_):
+            values = X[column]
+            kind = self.kind(column, values)
+            self.kinds_[column] = kind
+            if kind == "numeric":
+                out[j] = values.to_numpy(np.float32)
+                continue
+            codes, uniques = pd.factorize(values)
+            self.categories_[column] = pd.Index(uniques)
+            if kind == "ordinal":
+                ranks = np.array([ORDINAL_LEVELS[v] for v in uniques], dtype=np.float64)
+                self.tables_[column] = np.append(ranks, UNKNOWN_RANK).astype(np.float32)
+                out[j] = self.tables_[column][codes]
+                continue
+
+            m = len(uniques)
+            present = codes >= 0
+            sums = np.bincount(codes[present], weights=y[present], minlength=m)
+            counts = np.bincount(codes[present], minlength=m).astype(np.float64)
+            # Final table: every row's statistics; the extra last entry (index -1) is the prior
+            table = smoothed(sums, counts, self.prior_, self.min_samples_leaf, self.smoothing)
+            self.tables_[column] = np.append(table, self.prior_).astype(np.float32)
+
+            # Out-of-fold tables: row of fold f looks its category up in (all rows - fold f)
+            keys = fold[present] * m + codes[present]
+            per_fold_sums = np.bincount(keys, weights=y[present], minlength=k * m).reshape(k, m)
+            per_fold_counts = np.bincount(keys, minlength=k * m).reshape(k, m).astype(np.float64)
+            oof = smoothed(sums - per_fold_sums, counts - per_fold_counts, fold_priors[:, None],
+                           self.min_samples_leaf, self.smoothing)
+            oof = np.concatenate([oof, fold_priors[:, None]], axis=1).astype(np.float32)
+            # Flat index into the (k, m + 1) table; missing values (code -1) take the prior column m
+            index = fold * (m + 1) + np.where(codes >= 0, codes, m)
+            oof.ravel().take(index, out=out[j])
+        return out.T
+
+    def kind(self, column, values):
+        if self.cols is not None and column in self.cols:
+            return "target"
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            return "numeric"
+        if str(column).endswith("_ordinal") and set(values.dropna().unique()) <= ORDINAL_LEVELS.keys():
+            return "ordinal"
+        return "target"
+
+    def transform(self, X):
+        out = np.empty((len(self.feature_names_in_), len(X)), dtype=np.float32)
+        for j, column in enumerate(self.feature_names_in_):
+            values = X[column]
+            if self.kinds_[column] == "numeric":
+                out[j] = values.to_numpy(np.float32)
+            else:
+                # Unknown and missing values index -1, the table's fallback entry
+                out[j] = self.tables_[column][self.categories_[column].get_indexer(values)]
+        return out.T
+
+    def lookups(self):
+        # {column: ({value: encoded}, fallback)} for the non-numeric columns, used by predict.py
+        return {column: (dict(zip(self.categories_[column], self.tables_[column][:-1].tolist())),
+                         float(self.tables_[column][-1]))
+                for column in self.categories_}
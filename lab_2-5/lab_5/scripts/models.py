@@ -0,0 +1,112 @@
+import hashlib
+import importlib
+import json
+import time
+from io import StringIO
+
+# The six models of script1.py..script6.py, keyed by the name each script reports, as
+# (module, class, constructor arguments). Nothing is imported until a model is built, so a
+# caller only pays for the libraries it uses.
+MODELS = {
+    "LogisticRegression": ("sklearn.linear_model", "LogisticRegression", {"max_iter": 1000}),
+    "SVM": ("sklearn.svm", "SVC", {}),
+    "DecisionTree": ("sklearn.tree", "DecisionTreeClassifier", {}),
+    "RandomForest": ("sklearn.ensemble", "RandomForestClassifier", {}),
+    "XGBoost": ("xgboost", "XGBClassifier", {"eval_metric": "logloss"}),
+    "KNN": ("sklearn.neighbors", "KNeighborsClassifier", {}),
+}
+SCRIPTS = {
+    "script1": "LogisticRegression",
+    "script2": "SVM",
+    "script3": "DecisionTree",
+    "script4": "RandomForest",
+    "script5": "XGBoost",
+    "script6": "KNN",
+}
+# Installed distribution of each top-level package, for versioning cache keys without importing it
+DISTRIBUTIONS = {"sklearn": "scikit-learn", "xgboost": "xgboost"}
+SPLIT_SEED = 42
+TEST_SIZE = 0.2
+# Part of every cache key, so pipelines fitted with an older encoding are not served
+ENCODING = "fast_encoder-oof"
+SOURCES = ("csv", "columns")
+
+
+def make(name, **overrides):
+    module, cls, params = MODELS[name]
+    return getattr(importlib.import_module(module), cls)(**{**params, **overrides})
+
+
+def text_hash(csv_text):
+    return hashlib.sha256(csv_text.encode()).hexdigest()[:32]
+
+
+def record(timings, phase, start):
+    # Adds the seconds since start to timings[phase] when the caller asked for timings
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+def prepare(csv_text, timings=None):
+    import pandas as pd
+    start = time.perf_counter()
+    data = pd.read_csv(StringIO(csv_text))
+    record(timings, "parse", start)
+    return prepare_frame(data, timings)
+
+
+def prepare_frame(data, timings=None):
+    # The steps of script1.py..script6.py: an 80/20 split, then the training rows encoded out of fold
+    # and the test rows with the fitted encoder. Returns the encoder and the split as numpy arrays.
+    from sklearn.model_selection import train_test_split
+    from fast_encoder import FastTargetEncoder
+
+    start = time.perf_counter()
+    X = data.iloc[:, :-1]
+    y = data.iloc[:, -1]
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED)
+    encoder = FastTargetEncoder()
+    split = (encoder.fit_transform(X_train, y_train), encoder.transform(X_test), y_train.to_numpy(), y_test.to_numpy())
+    record(timings, "encode", start)
+    return encoder, split
+
+
+def fit(name, split, timings=None):
+    from sklearn.metrics import accuracy_score
+    X_train, X_test, y_train, y_test = split
+    model = make(name)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    record(timings, "fit", start)
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    record(timings, "predict", start)
+    return model, accuracy_score(y_test, y_pred)
+
+
+def result(name, accuracy, timings):
+    # The JSON result of one model: "time" is the total, as printed by the scripts, and "timings" its phases
+    return {"model": name, "accuracy": accuracy, "time": round(sum(timings.values()), 2),
+            "timings": {phase: round(seconds, 4) for phase, seconds in timings.items()}}
+
+
+def run_script(name, csv_text):
+    # The body of script1.py..script6.py: parse, split, encode and fit one model, and print its result
+    timings = {}
+    _, split = prepare(csv_text, timings)
+    _, accuracy = fit(name, split, timings)
+    print(json.dumps(result(name, accuracy, timings)))
+
+
+def cache_key(dataset, name, source):
+    # source is how the features were loaded: "csv" (pandas parse, float64) or "columns" (the
+    # dataset cache, float32 and categoricals). A file hashes the same either way, but the two
+    # pipelines fit on different feature values, so they must not answer for each other.
+    from importlib.metadata import version
+    from artifact_cache import artifact_key
+    if source not in SOURCES:
+        raise ValueError(f"Unknown source: {source}")
+    module, cls, params = MODELS[name]
+    library = version(DISTRIBUTIONS[module.split(".")[0]])
+    return artifact_key(f"{dataset}:{source}:{ENCODING}", f"{module}.{cls}", library, params, SPLIT_SEED, TEST_SIZE)
@@ -0,0 +1,359 @@
+import argparse
+import collections
+import io
+import json
+import math
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+import numpy as np
+
+# Nominal and ordinal columns of the collision schema, which pd.get_dummies expands
+CATEGORICAL = re.compile(r"^Obj\d+_Feature\d+_(nominal|ordinal)$")
+DEFAULT_MODEL = Path(__file__).resolve().parents[2] / "lab_2" / "best_collision_model.joblib"
+
+
+def dummy_columns(features):
+    # Source columns of get_dummies indicators: collision-schema categoricals, plus any other
+    # prefix shared by several "<prefix>_<value>" names
+    counts = {}
+    for feature in features:
+        if "_" in feature:
+            prefix = feature.rsplit("_", 1)[0]
+            counts[prefix] = counts.get(prefix, 0) + 1
+    return {prefix for prefix, count in counts.items()
+            if prefix not in features and (count > 1 or CATEGORICAL.match(prefix))}
+
+
+class Scorer:
+    # A fitted model plus the encoding its features need, applied to plain rows ({column: value})
+    # column by column with numpy instead of through a DataFrame. Handles the two kinds of joblib
+    # files in the repo: a bare estimator fitted on pd.get_dummies output (lab_2), whose one-hot
+    # layout is read back from feature_names_in_, and an artifact_cache.py entry holding a
+    # FastTargetEncoder next to the model (lab_5).
+    def __init__(self, path):
+        import joblib
+        # mmap_mode leaves the model's arrays (support vectors, trees, ...) in the page cache
+        loaded = joblib.load(path, mmap_mode="r")
+        if isinstance(loaded, dict):
+            self.model = loaded["model"]
+            self.target_encoding(loaded["encoder"])
+        else:
+            self.model = loaded
+            self.one_hot(list(loaded.feature_names_in_))
+
+    def one_hot(self, features):
+        # "Obj1_Feature2_nominal_A" is the indicator of value "A" in column "Obj1_Feature2_nominal";
+        # any other name is a numeric column passed through
+        self.columns = []
+        self.choices = {}
+        self.steps = []
+        self.features = features
+        expanded = dummy_columns(features)
+        for feature in features:
+            column = feature.rsplit("_", 1)[0] if "_" in feature else None
+            if column in expanded:
+                value = feature[len(column) + 1:]
+                self.steps.append((column, value))
+                self.choices.setdefault(column, []).append(value)
+            else:
+                column = feature
+                self.steps.append((column, None))
+            self.add_column(column)
+
+    def target_encoding(self, encoder):
+        self.columns = []
+        self.choices = {}
+        self.steps = []
+        lookups = {}
+        if hasattr(encoder, "lookups"):
+            # fast_encoder.FastTargetEncoder
+            lookups = encoder.lookups()
+            self.choices = {column: list(lookup) for column, (lookup, _) in lookups.items()}
+            features = list(encoder.feature_names_in_)
+        elif encoder is not None:
+            raise ValueError(f"Unsupported encoder {type(encoder).__name__}: refit the cache entry with fast_encoder")
+        else:
+            features = list(self.model.feature_names_in_)
+        self.features = features
+        for feature in features:
+            self.steps.append((feature, lookups.get(feature)))
+            self.add_column(feature)
+
+    def add_column(self, column):
+        if column not in self.columns:
+            self.columns.append(column)
+
+    def check(self, row):
+        # Why encode() could not use this row, or None: passed-through columns need a finite number,
+        # one-hot and target-encoded ones a single JSON scalar
+        for column, how in self.steps:
+            value = row[column]
+            if how is None:
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    return f"{column}: expected a number, got {json.dumps(value)}"
+                if not math.isfinite(number):
+                    return f"{column}: expected a finite number, got {json.dumps(value)}"
+            elif isinstance(value, (list, dict)):
+                return f"{column}: expected a single value, got {json.dumps(value)}"
+        return None
+
+    def encode(self, rows):
+        X = np.empty((len(rows), len(self.steps)), dtype=np.float64)
+        values = {column: [row.get(column) for row in rows] for column in self.columns}
+        for j, (column, how) in enumerate(self.steps):
+            if how is None:
+                X[:, j] = np.array(values[column], dtype=np.float64)
+            elif isinstance(how, str):
+                X[:, j] = np.array(values[column], dtype=object) == how
+            else:
+                lookup, prior = how
+                X[:, j] = [lookup.get(v, prior) for v in values[column]]
+        return X
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+class Inbox:
+    # Reader-to-scorer hand-off. deque appends and pops are atomic, so a row costs far less than a
+    # queue.Queue put/get; the event only wakes the scorer when it is waiting.
+    def __init__(self):
+        self.items = collections.deque()
+        self.ready = threading.Event()
+        self.closed = False
+        # Set by the reader: lines answered with an error, and those of them that were not JSON at all
+        self.rejected = 0
+        self.malformed = 0
+
+    def put(self, item):
+        self.items.append(item)
+        self.ready.set()
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+    def wait(self, timeout=None):
+        # Returns once an item is waiting, the reader is done, or the timeout passes
+        self.ready.clear()
+        if not self.items and not self.closed:
+            self.ready.wait(timeout)
+
+
+class Rejected:
+    # A JSON line that is answered with an error instead of a prediction
+    def __init__(self, line, error, row_id=None):
+        self.line = line
+        self.error = error
+        self.row_id = row_id
+
+    def response(self):
+        response = {"line": self.line, "error": self.error}
+        if self.row_id is not None:
+            response["id"] = self.row_id
+        return response
+
+
+def check_row(line, text, scorer):
+    # The parsed row, or a Rejected when the line is not a JSON object holding a usable value for
+    # every feature
+    try:
+        row = json.loads(text)
+    except json.JSONDecodeError as e:
+        return Rejected(line, f"invalid JSON: {e}")
+    if not isinstance(row, dict):
+        return Rejected(line, "expected a JSON object")
+    missing = [column for column in scorer.columns if column not in row]
+    if missing:
+        return Rejected(line, f"missing features: {', '.join(missing[:5])}{' ...' if len(missing) > 5 else ''}",
+                        row.get("id"))
+    error = scorer.check(row)
+    if error:
+        return Rejected(line, error, row.get("id"))
+    return row
+
+
+def read_json_lines(stream, inbox, scorer, rate=0):
+    # rate > 0 paces arrivals at that many rows per second, to measure latency below saturation
+    start = time.perf_counter()
+    for i, line in enumerate(stream):
+        if rate:
+            ahead = start + i / rate - time.perf_counter()
+            if ahead > 0.001:
+                time.sleep(ahead)
+        if line.strip():
+            row = check_row(i + 1, line, scorer)
+            if isinstance(row, Rejected):
+                inbox.rejected += 1
+                inbox.malformed += row.error.startswith("invalid JSON")
+            inbox.put((time.perf_counter(), row))
+    inbox.close()
+
+
+def read_frames(stream, inbox, width):
+    # Binary frames: int32 row count, then rows x width float32 already-encoded features. A bad
+    # frame leaves no way to find where the next one starts, so it is counted as malformed input
+    # and ends the stream; close() runs whatever happens so serve() never waits on a dead reader.
+    try:
+        frame = 0
+        while True:
+            header = stream.read(4)
+            if not header:
+                break
+            frame += 1
+            n = int(np.frombuffer(header, dtype="<i4")[0]) if len(header) == 4 else 0
+            data = stream.read(4 * n * width) if n > 0 else b""
+            if n < 0 or len(header) < 4 or len(data) != 4 * n * width:
+                inbox.rejected += 1
+                inbox.malformed += 1
+                error = f"negative row count {n}" if n < 0 else "truncated frame"
+                print(json.dumps({"frame": frame, "error": error}), file=sys.stderr, flush=True)
+                break
+            inbox.put((time.perf_counter(), np.frombuffer(data, dtype="<f4").reshape(n, width)))
+    finally:
+        inbox.close()
+
+
+def size(item):
+    return len(item[1]) if isinstance(item[1], np.ndarray) else 1
+
+
+def serve(scorer, inbox, write, max_batch=4096, window=0.002):
+    # Micro-batching: the oldest waiting item opens a batch, which is scored once it holds max_batch
+    # rows or `window` seconds after that item arrived, whichever comes first. Returns per-row latencies.
+    latencies = []
+    batches = 0
+    while True:
+        while not inbox.items and not inbox.closed:
+            inbox.wait()
+        if not inbox.items:
+            break
+        deadline = inbox.items[0][0] + window
+        items = []
+        rows = 0
+        while rows < max_batch:
+            if inbox.items:
+                items.append(inbox.items.popleft())
+                rows += size(items[-1])
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or inbox.closed:
+                break
+            inbox.wait(remaining)
+
+        if isinstance(items[0][1], np.ndarray):
+            predictions = scorer.predict(np.concatenate([block for _, block in items]))
+        else:
+            rows = [row for _, row in items if not isinstance(row, Rejected)]
+            predictions = scorer.predict(scorer.encode(rows)) if rows else []
+        write(items, predictions)
+        arrivals = np.array([arrival for arrival, _ in items])
+        latencies.append(np.repeat(time.perf_counter() - arrivals, [size(item) for item in items]))
+        batches += 1
+    return np.concatenate(latencies) if latencies else np.zeros(0), batches
+
+
+def json_writer(stream):
+    def write(items, predictions):
+        # Rejected rows get their error, in place, so responses stay in request order
+        lines = []
+        predictions = iter(predictions)
+        for _, row in items:
+            if isinstance(row, Rejected):
+                lines.append(json.dumps(row.response()))
+                continue
+            result = {"prediction": next(predictions).item()}
+            if "id" in row:
+                result["id"] = row["id"]
+            lines.append(json.dumps(result))
+        stream.write("\n".join(lines) + "\n")
+        stream.flush()
+    return write
+
+
+def frame_writer(stream):
+    def write(items, predictions):
+        # One reply frame per request frame: the row count, then one int8 class label per row
+        offset = 0
+        for _, block in items:
+            stream.write(np.int32(len(block)).tobytes())
+            stream.write(predictions[offset:offset + len(block)].astype(np.int8).tobytes())
+            offset += len(block)
+        stream.flush()
+    return write
+
+
+def report(latencies, batches, seconds, inbox):
+    return {
+        "rows": len(latencies),
+        "batches": batches,
+        "rejected": inbox.rejected,
+        "malformed": inbox.malformed,
+        "rows_per_sec": round(len(latencies) / seconds, 1) if seconds > 0 else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3) if len(latencies) else None,
+    }
+
+
+def synthetic_rows(scorer, n, seed=0):
+    # Rows in the collision feature schema: nominal/ordinal columns draw from the model's known
+    # values, *_binary columns 0/1 and everything else N(0, 1)
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for column in scorer.columns:
+        if column in scorer.choices:
+            columns[column] = rng.choice(scorer.choices[column], n).tolist()
+        elif column.endswith("_binary"):
+            columns[column] = rng.integers(0, 2, n).tolist()
+        else:
+            columns[column] = rng.normal(size=n).round(6).tolist()
+    return [{"id": i, **{column: columns[column][i] for column in scorer.columns}} for i in range(n)]
+
+
+def run(scorer, source, sink, binary, max_batch, window, rate=0):
+    inbox = Inbox()
+    if binary:
+        reader = threading.Thread(target=read_frames, args=(source, inbox, len(scorer.steps)), daemon=True)
+        write = frame_writer(sink)
+    else:
+        reader = threading.Thread(target=read_json_lines, args=(source, inbox, scorer, rate), daemon=True)
+        write = json_writer(sink)
+    start = time.perf_counter()
+    reader.start()
+    latencies, batches = serve(scorer, inbox, write, max_batch, window)
+    return report(latencies, batches, time.perf_counter() - start, inbox)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score collision rows with a fitted model in micro-batches")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL),
+                        help="joblib file: a bare estimator or an artifact_cache.py entry")
+    parser.add_argument("--binary", action="store_true",
+                        help="read int32-count + float32 frames of encoded features instead of JSON lines")
+    parser.add_argument("--max-batch", type=int, default=4096)
+    parser.add_argument("--window-ms", type=float, default=2.0, help="longest a row waits for its batch to fill")
+    parser.add_argument("--bench", type=int, default=0, help="score this many synthetic rows and print the report")
+    parser.add_argument("--rate", type=float, default=0, help="with --bench: rows per second offered (0: as fast as possible)")
+    args = parser.parse_args()
+
+    scorer = Scorer(args.model)
+    if args.bench:
+        lines = "".join(json.dumps(row) + "\n" for row in synthetic_rows(scorer, args.bench))
+        summary = run(scorer, io.StringIO(lines), io.StringIO(), False, args.max_batch, args.window_ms / 1000,
+                      args.rate)
+        print(json.dumps(summary))
+    else:
+        source = sys.stdin.buffer if args.binary else sys.stdin
+        sink = sys.stdout.buffer if args.binary else sys.stdout
+        # The encoded feature order, which --binary frames must follow
+        print(json.dumps({"features": scorer.features}), file=sys.stderr, flush=True)
+        summary = run(scorer, source, sink, args.binary, args.max_batch, args.window_ms / 1000)
+        print(json.dumps(summary), file=sys.stderr)
+        # Rows with missing features are the caller's to fix; input that is not JSON lines at all fails the run
+        if summary["malformed"]:
+            sys.exit(1)
@@ -0,0 +1,271 @@
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from models import ENCODING, MODELS, make, prepare, prepare_frame, text_hash
+
+# Search space per model. A list is a set of choices; ("log", lo, hi), ("uniform", lo, hi) and
+# ("int", lo, hi) are ranges, sampled by random search and cut into --grid-points values by grid search.
+SPACES = {
+    "LogisticRegression": {"C": ("log", 1e-3, 1e3)},
+    "SVM": {"C": ("log", 1e-2, 1e3), "gamma": ["scale", 0.01, 0.1, 1.0]},
+    "DecisionTree": {"max_depth": [None, 4, 8, 16], "min_samples_leaf": ("int", 1, 20),
+                     "criterion": ["gini", "entropy"]},
+    "RandomForest": {"n_estimators": ("int", 50, 400), "max_depth": [None, 8, 16],
+                     "max_features": ["sqrt", "log2", 0.5]},
+    "XGBoost": {"n_estimators": ("int", 50, 400), "max_depth": ("int", 2, 8),
+                "learning_rate": ("log", 0.01, 0.3), "subsample": ("uniform", 0.6, 1.0)},
+    "KNN": {"n_neighbors": ("int", 1, 50), "weights": ["uniform", "distance"], "p": [1, 2]},
+}
+STRATEGIES = ("grid", "random", "halving")
+# Models that spawn their own threads; they get one each, since the pool is what uses all cores
+THREADED = {"RandomForest", "XGBoost", "KNN"}
+
+
+def grid_values(spec, points):
+    if isinstance(spec, list):
+        return spec
+    kind, lo, hi = spec
+    if kind == "log":
+        return [float(v) for v in np.geomspace(lo, hi, points)]
+    if kind == "int":
+        return sorted({int(round(v)) for v in np.linspace(lo, hi, points)})
+    return [float(v) for v in np.linspace(lo, hi, points)]
+
+
+def sample_value(spec, rng):
+    if isinstance(spec, list):
+        return spec[rng.integers(len(spec))]
+    kind, lo, hi = spec
+    if kind == "log":
+        return float(math.exp(rng.uniform(math.log(lo), math.log(hi))))
+    if kind == "int":
+        return int(rng.integers(lo, hi + 1))
+    return float(rng.uniform(lo, hi))
+
+
+def candidates(space, strategy, n_iter, grid_points, seed):
+    # Deterministic for a given seed, so a resumed search proposes the same configurations again
+    if strategy == "grid":
+        names = list(space)
+        values = [grid_values(space[name], grid_points) for name in names]
+        return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    rng = np.random.default_rng(seed)
+    return [{name: sample_value(spec, rng) for name, spec in space.items()} for _ in range(n_iter)]
+
+
+def task_key(dataset, source, name, params, rows, folds, seed):
+    # source ("csv" or "columns") and ENCODING are part of the key for the same reason as in
+    # models.cache_key: the same file loaded another way, or encoded another way, is other features
+    text = json.dumps([dataset, source, ENCODING, name, params, rows, folds, seed], sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()[:24]
+
+
+class Journal:
+    # Append-only JSON lines, one per finished evaluation. A line is only written once the
+    # evaluation is complete, so after an interruption every line can be trusted; a torn last line
+    # is ignored.
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.results[record["key"]] = record
+        self.file = open(path, "a") if path else None
+
+    def add(self, record):
+        self.results[record["key"]] = record
+        if self.file:
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+worker = {}
+
+
+def share(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def attach(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+def init_worker(x_spec, y_spec, order, folds, seed, best, tolerance):
+    # Every worker maps the one encoded training set instead of receiving its own copy
+    worker["shm"], worker["X"] = attach(x_spec)
+    worker["y_shm"], worker["y"] = attach(y_spec)
+    worker.update(order=order, folds=folds, seed=seed, best=best, tolerance=tolerance)
+
+
+def evaluate(task):
+    # k-fold CV of one configuration on the first `rows` rows of a fixed shuffle. After each fold
+    # the running mean is compared with the best finished configuration, and hopeless ones stop early.
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import StratifiedKFold
+    key, name, params, rows = task
+    start = time.time()
+    X, y = worker["X"], worker["y"]
+    subset = worker["order"][:rows]
+    scores = []
+    stopped = False
+    splitter = StratifiedKFold(worker["folds"], shuffle=True, random_state=worker["seed"])
+    try:
+        for train, val in splitter.split(subset, y[subset]):
+            fold_params = dict(params)
+            if "n_neighbors" in fold_params:
+                # Early halving rounds can have fewer training rows than the sampled neighbour count
+                fold_params["n_neighbors"] = min(fold_params["n_neighbors"], len(train))
+            model = make(name, **fold_params, **({"n_jobs": 1} if name in THREADED else {}))
+            model.fit(X[subset[train]], y[subset[train]])
+            scores.append(accuracy_score(y[subset[val]], model.predict(X[subset[val]])))
+            if len(scores) < worker["folds"] and np.mean(scores) < worker["best"].value - worker["tolerance"]:
+                stopped = True
+                break
+    except Exception as e:
+        # One failing configuration is journalled as such instead of aborting the whole search
+        return {"key": key, "model": name, "params": params, "rows": rows, "fold_scores": scores,
+                "cv_accuracy": float("-inf"), "stopped": True, "error": f"{type(e).__name__}: {e}",
+                "time": round(time.time() - start, 3)}
+    return {"key": key, "model": name, "params": params, "rows": rows, "fold_scores": scores,
+            "cv_accuracy": float(np.mean(scores)), "stopped": stopped, "time": round(time.time() - start, 3)}
+
+
+def run_round(pool, journal, best, dataset, source, name, configs, rows, args):
+    # Evaluates configs on `rows` rows, reusing journal results, and returns them in config order
+    tasks = []
+    records = []
+    for params in configs:
+        key = task_key(dataset, source, name, params, rows, args.folds, args.seed)
+        if key in journal.results:
+            records.append(journal.results[key])
+        else:
+            tasks.append((key, name, params, rows))
+    finished = [r["cv_accuracy"] for r in records if not r["stopped"]]
+    best.value = max(finished, default=-1.0)
+    for record in pool.imap_unordered(evaluate, tasks):
+        journal.add(record)
+        records.append(record)
+        if not record["stopped"]:
+            best.value = max(best.value, record["cv_accuracy"])
+    order = {task_key(dataset, source, name, params, rows, args.folds, args.seed): i for i, params in enumerate(configs)}
+    return sorted(records, key=lambda r: order[r["key"]])
+
+
+def search_model(pool, journal, best, dataset, source, name, n_train, args):
+    configs = candidates(SPACES[name], "grid" if args.strategy == "grid" else "random", args.n_iter,
+                         args.grid_points, args.seed)
+    if args.strategy != "halving":
+        records = run_round(pool, journal, best, dataset, source, name, configs, n_train, args)
+        return records, len(records)
+
+    # Successive halving: every configuration gets a small share of the rows; the best 1/eta of each
+    # round move on with eta times the rows, until the survivors are evaluated on all of them
+    rounds = max(int(math.log(len(configs), args.eta)), 0)
+    evaluated = 0
+    for i in range(rounds + 1):
+        if i == rounds or len(configs) <= 1:
+            rows = n_train
+        else:
+            rows = min(max(n_train // args.eta ** (rounds - i), args.folds * 10), n_train)
+        records = run_round(pool, journal, best, dataset, source, name, configs, rows, args)
+        evaluated += len(records)
+        if rows == n_train:
+            # Only the last round's results compete for the final pick
+            return records, evaluated
+        keep = max(len(configs) // args.eta, 1)
+        ranked = sorted(records, key=lambda r: (r["stopped"], -r["cv_accuracy"]))
+        configs = [r["params"] for r in ranked[:keep]]
+
+
+def run_search(csv_text, data_path, args):
+    start = time.time()
+    if data_path:
+        from dataset_cache import dataset_hash, read_dataset
+        dataset, source = dataset_hash(data_path), "columns"
+        encoder, (X_train, X_test, y_train, y_test) = prepare_frame(read_dataset(data_path))
+    else:
+        dataset, source = text_hash(csv_text), "csv"
+        encoder, (X_train, X_test, y_train, y_test) = prepare(csv_text)
+    prepare_time = time.time() - start
+    # Model libraries are imported before forking so the workers share them
+    for name in args.models:
+        make(name)
+
+    order = np.random.default_rng(args.seed).permutation(len(y_train))
+    x_shm, x_spec = share(X_train)
+    y_shm, y_spec = share(y_train)
+    journal = Journal(args.journal)
+    ctx = mp.get_context("fork")
+    best = ctx.Value("d", -1.0, lock=False)
+    try:
+        with ctx.Pool(args.workers or os.cpu_count(), initializer=init_worker,
+                      initargs=(x_spec, y_spec, order, args.folds, args.seed, best, args.tolerance)) as pool:
+            for name in args.models:
+                start = time.time()
+                records, evaluated = search_model(pool, journal, best, dataset, source, name, len(y_train), args)
+                usable = [r for r in records if "error" not in r]
+                if not usable:
+                    print(json.dumps({"model": name, "error": records[0]["error"] if records else "no configurations",
+                                      "strategy": args.strategy, "evaluated": evaluated}), flush=True)
+                    continue
+                finished = [r for r in usable if not r["stopped"]] or usable
+                top = max(finished, key=lambda r: r["cv_accuracy"])
+                # The winner is refitted on the whole training split and scored on the held-out 20%,
+                # exactly as the scripts score their default configuration
+                model = make(name, **top["params"])
+                model.fit(X_train, y_train)
+                accuracy = float(np.mean(model.predict(X_test) == y_test))
+                print(json.dumps({
+                    "model": name,
+                    "accuracy": accuracy,
+                    "time": round(prepare_time + time.time() - start, 2),
+                    "params": top["params"],
+                    "cv_accuracy": top["cv_accuracy"],
+                    "strategy": args.strategy,
+                    "evaluated": evaluated,
+                }), flush=True)
+    finally:
+        journal.close()
+        for shm in (x_shm, y_shm):
+            shm.close()
+            shm.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter search for the lab_5 models")
+    parser.add_argument("--data", default=None, help="load this CSV through the dataset cache instead of stdin")
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--strategy", choices=STRATEGIES, default="random")
+    parser.add_argument("--n-iter", type=int, default=20, help="configurations per model for random and halving")
+    parser.add_argument("--grid-points", type=int, default=3, help="values per range in grid search")
+    parser.add_argument("--eta", type=int, default=3, help="halving factor")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="stop a configuration whose running CV accuracy trails the best by more than this")
+    parser.add_argument("--workers", type=int, default=0, help="evaluation processes (0: one per CPU core)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--journal", default=None, help="JSON-lines results file; an interrupted search resumes from it")
+    args = parser.parse_args()
+    run_search(None if args.data else sys.stdin.read(), args.data, args)
@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from fast_encoder import ORDINAL_LEVELS, UNKNOWN_RANK, smoothed
+
+
+class StreamingTargetEncoder:
+    # fast_encoder.FastTargetEncoder, fitted from running per-fold, per-category sums and counts so it
+    # never needs the whole column: ordinal columns take their ORDINAL_LEVELS rank, the other
+    # categorical columns are target-encoded. Categories get integer codes in order of first appearance.
+    # Like FastTargetEncoder.fit_transform, a training row of fold f is encoded from the statistics of
+    # the other folds; held-out rows use the final table of all training rows.
+    def __init__(self, ordinal, folds=5, min_samples_leaf=20, smoothing=10.0):
+        self.ordinal = list(ordinal)
+        self.folds = folds
+        self.min_samples_leaf = min_samples_leaf
+        self.smoothing = smoothing
+        num_cols = len(self.ordinal)
+        self.vocab = [{} for _ in range(num_cols)]
+        self.sums = [np.zeros((folds, 0)) for _ in range(num_cols)]
+        self.counts = [np.zeros((folds, 0)) for _ in range(num_cols)]
+        self.target_sums = np.zeros(folds)
+        self.target_counts = np.zeros(folds)
+        self.mapping = None
+        self.fold_mapping = None
+
+    def codes(self, i, column):
+        # Global codes for one chunk of column i; missing values get -1
+        local, uniques = pd.factorize(column)
+        vocab = self.vocab[i]
+        lookup = np.array([vocab.setdefault(value, len(vocab)) for value in uniques] + [-1], dtype=np.int32)
+        return lookup[local]
+
+    def update(self, codes, y, fold):
+        # codes: (rows, columns) int32 from codes(), y and fold: targets and folds of the same training rows
+        fold = fold.astype(np.intp)
+        self.target_sums += np.bincount(fold, weights=y, minlength=self.folds)
+        self.target_counts += np.bincount(fold, minlength=self.folds)
+        for i in range(codes.shape[1]):
+            present = codes[:, i] >= 0
+            size = len(self.vocab[i])
+            keys = fold[present] * size + codes[present, i]
+            sums = np.bincount(keys, weights=y[present], minlength=self.folds * size).reshape(self.folds, size)
+            counts = np.bincount(keys, minlength=self.folds * size).reshape(self.folds, size)
+            self.sums[i] = self.padded(self.sums[i], size) + sums
+            self.counts[i] = self.padded(self.counts[i], size) + counts
+
+    def padded(self, table, size):
+        # Per-fold statistics widened to categories first seen in later chunks
+        return np.pad(table, ((0, 0), (0, size - table.shape[1])))
+
+    def finalize(self):
+        # Categories unseen by the rows a table is built from, and missing values, encode as that
+        # table's prior; levels outside ORDINAL_LEVELS and missing values of ordinal columns as UNKNOWN_RANK
+        total, count = self.target_sums.sum(), self.target_counts.sum()
+        prior = total / max(count, 1)
+        # Prior of each fold from the other folds' rows, shape (folds, 1) to broadcast over categories
+        fold_priors = ((total - self.target_sums) / np.maximum(count - self.target_counts, 1))[:, None]
+        self.mapping = []
+        self.fold_mapping = []
+        for i, vocab in enumerate(self.vocab):
+            if self.ordinal[i]:
+                ranks = [ORDINAL_LEVELS.get(value, UNKNOWN_RANK) for value in vocab]
+                self.mapping.append(np.array(ranks + [UNKNOWN_RANK], dtype=np.float32))
+                self.fold_mapping.append(None)
+                continue
+            size = len(vocab)
+            sums = self.padded(self.sums[i], size)
+            counts = self.padded(self.counts[i], size).astype(np.float64)
+            encoded = smoothed(sums.sum(axis=0), counts.sum(axis=0), prior, self.min_samples_leaf, self.smoothing)
+            self.mapping.append(np.append(encoded, prior).astype(np.float32))
+            # Row f: the table fold f's training rows are encoded with, from (all folds - fold f)
+            out_of_fold = smoothed(sums.sum(axis=0) - sums, counts.sum(axis=0) - counts, fold_priors,
+                                   self.min_samples_leaf, self.smoothing)
+            self.fold_mapping.append(np.hstack([out_of_fold, fold_priors]).astype(np.float32))
+        return self
+
+    def transform(self, codes, fold=None):
+        # fold: the folds of training rows, encoded out of fold; None encodes with the final tables.
+        # Code -1 indexes the trailing prior entry.
+        columns = []
+        for i in range(codes.shape[1]):
+            if fold is None or self.fold_mapping[i] is None:
+                columns.append(self.mapping[i][codes[:, i]])
+            else:
+                columns.append(self.fold_mapping[i][fold, codes[:, i]])
+        return np.stack(columns, axis=1)
+
+
+class Spool:
+    # Parsed chunks (category codes, float32 numerics, targets, held-out mask, encoder folds) written
+    # to disk once, so later epochs never re-parse the CSV and only one chunk is in memory at a time
+    def __init__(self, path):
+        self.path = path
+        self.chunks = 0
+
+    def write(self, codes, numeric, y, test, fold):
+        np.savez(os.path.join(self.path, f"{self.chunks:06d}.npz"), codes=codes, numeric=numeric, y=y, test=test,
+                 fold=fold)
+        self.chunks += 1
+
+    def read(self, chunk):
+        with np.load(os.path.join(self.path, f"{chunk:06d}.npz")) as f:
+            return f["codes"], f["numeric"], f["y"], f["test"], f["fold"]
+
+
+class Stream:
+    def __init__(self, source, spool_dir, chunk_rows=100_000, test_size=0.2, seed=42):
+        self.source = source
+        self.spool = Spool(spool_dir)
+        self.chunk_rows = chunk_rows
+        self.test_size = test_size
+        self.seed = seed
+        self.columns = None
+        self.categorical = None
+        self.encoder = None
+        self.classes = np.zeros(0, dtype=np.int64)
+        self.train_rows = 0
+        self.test_rows = 0
+
+    def ingest(self):
+        # One pass over the CSV: assign each row to train or held-out and to an encoder fold,
+        # accumulate encoder statistics from the training rows only, and spool the chunk
+        rng = np.random.default_rng(self.seed)
+        # Folds come from their own generator so the held-out split does not depend on them
+        fold_rng = np.random.default_rng(np.random.SeedSequence(self.seed).spawn(1)[0])
+        for frame in pd.read_csv(self.source, chunksize=self.chunk_rows):
+            if self.columns is None:
+                self.columns = list(frame.columns[:-1])
+                self.categorical = np.array([not pd.api.types.is_numeric_dtype(frame[c]) for c in self.columns])
+                # Decided on the first chunk, as FastTargetEncoder.kind decides on the whole column
+                ordinal = [str(c).endswith("_ordinal") and set(frame[c].dropna().unique()) <= ORDINAL_LEVELS.keys()
+                           for c in np.array(self.columns)[self.categorical]]
+                self.encoder = StreamingTargetEncoder(ordinal)
+            features = frame.iloc[:, :-1]
+            y = frame.iloc[:, -1].to_numpy()
+            codes = np.empty((len(frame), int(self.categorical.sum())), dtype=np.int32)
+            for i, column in enumerate(np.array(self.columns)[self.categorical]):
+                codes[:, i] = self.encoder.codes(i, features[column])
+            numeric = features.loc[:, ~self.categorical].to_numpy(np.float32)
+            test = rng.random(len(frame)) < self.test_size
+            fold = fold_rng.integers(0, self.encoder.folds, len(frame)).astype(np.int8)
+
+            train = ~test
+            self.encoder.update(codes[train], y[train].astype(np.float64), fold[train])
+            self.classes = np.union1d(self.classes, np.unique(y))
+            self.train_rows += int(train.sum())
+            self.test_rows += int(test.sum())
+            self.spool.write(codes, numeric, y, test, fold)
+        self.encoder.finalize()
+        return self
+
+    def batches(self, test=False, shuffle_rng=None):
+        # (X, y) per spooled chunk in column order, training or held-out rows only
+        order = np.arange(self.spool.chunks)
+        if shuffle_rng is not None:
+            shuffle_rng.shuffle(order)
+        for chunk in order:
+            codes, numeric, y, held_out, fold = self.spool.read(chunk)
+            rows = held_out if test else ~held_out
+            X = np.empty((int(rows.sum()), len(self.columns)), dtype=np.float32)
+            X[:, self.categorical] = self.encoder.transform(codes[rows], None if test else fold[rows])
+            X[:, ~self.categorical] = numeric[rows]
+            y = y[rows]
+            if shuffle_rng is not None:
+                perm = shuffle_rng.permutation(len(y))
+                X, y = X[perm], y[perm]
+            if len(y):
+                yield X, y
+
+
+def partial_fit_model(model, stream, epochs, seed, scale):
+    from sklearn.preprocessing import StandardScaler
+    scaler = None
+    if scale:
+        scaler = StandardScaler()
+        for X, _ in stream.batches():
+            scaler.partial_fit(X)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        for X, y in stream.batches(shuffle_rng=rng):
+            model.partial_fit(scaler.transform(X) if scaler else X, y, classes=stream.classes)
+    correct = 0
+    for X, y in stream.batches(test=True):
+        correct += int((model.predict(scaler.transform(X) if scaler else X) == y).sum())
+    return correct
+
+
+def fit_xgboost(stream, rounds, cache_dir):
+    # External memory: XGBoost pulls training batches through the iterator and pages its quantized
+    # copy to cache_dir instead of holding the data in RAM
+    import xgboost as xgb
+
+    class SpoolIter(xgb.DataIter):
+        def __init__(self):
+            self.batches = None
+            super().__init__(cache_prefix=os.path.join(cache_dir, "xgb"))
+
+        def next(self, input_data):
+            if self.batches is None:
+                self.batches = stream.batches()
+            batch = next(self.batches, None)
+            if batch is None:
+                return False
+            X, y = batch
+            input_data(data=X, label=np.searchsorted(stream.classes, y))
+            return True
+
+        def reset(self):
+            self.batches = None
+
+    train = xgb.ExtMemQuantileDMatrix(SpoolIter())
+    if len(stream.classes) > 2:
+        params = {"objective": "multi:softmax", "num_class": len(stream.classes)}
+    else:
+        params = {"objective": "binary:logistic", "eval_metric": "logloss"}
+    booster = xgb.train({**params, "tree_method": "hist", "nthread": os.cpu_count()}, train, rounds)
+
+    correct = 0
+    for X, y in stream.batches(test=True):
+        predicted = booster.inplace_predict(X)
+        labels = predicted.astype(np.int64) if len(stream.classes) > 2 else (predicted > 0.5).astype(np.int64)
+        correct += int((stream.classes[labels] == y).sum())
+    return correct
+
+
+# Models that learn batch by batch, keyed by the name reported in the JSON line
+def sgd(seed):
+    from sklearn.linear_model import SGDClassifier
+    return SGDClassifier(loss="log_loss", random_state=seed), True
+
+
+def naive_bayes(seed):
+    from sklearn.naive_bayes import GaussianNB
+    return GaussianNB(), False
+
+
+def mlp(seed):
+    from sklearn.neural_network import MLPClassifier
+    return MLPClassifier(hidden_layer_sizes=(64,), random_state=seed), True
+
+
+STREAM_MODELS = {"SGDLogistic": sgd, "GaussianNB": naive_bayes, "MLP": mlp, "XGBoost": None}
+
+
+def run_stream(source, model_names, chunk_rows=100_000, epochs=5, rounds=100, seed=42, spool_dir=None):
+    with tempfile.TemporaryDirectory(dir=spool_dir) as tmp:
+        start = time.time()
+        stream = Stream(source, tmp, chunk_rows, seed=seed).ingest()
+        ingest_time = time.time() - start
+        for name in model_names:
+            start = time.time()
+            if name == "XGBoost":
+                correct = fit_xgboost(stream, rounds, tmp)
+            else:
+                model, scale = STREAM_MODELS[name](seed)
+                correct = partial_fit_model(model, stream, epochs, seed, scale)
+            print(json.dumps({
+                "model": name,
+                "accuracy": correct / max(stream.test_rows, 1),
+                "time": round(ingest_time + time.time() - start, 2),
+                "train_rows": stream.train_rows,
+                "test_rows": stream.test_rows,
+                # Linux reports ru_maxrss in KiB
+                "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            }), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit lab_5 models on a CSV too large for memory, chunk by chunk")
+    parser.add_argument("--data", default=None, help="CSV file to read (default: stdin)")
+    parser.add_argument("--models", nargs="+", default=list(STREAM_MODELS), choices=list(STREAM_MODELS))
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--epochs", type=int, default=5, help="passes over the training rows for partial_fit models")
+    parser.add_argument("--rounds", type=int, default=100, help="XGBoost boosting rounds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--spool-dir", default=None, help="where parsed chunks are kept (default: system temp dir)")
+    args = parser.parse_args()
+    run_stream(args.data or sys.stdin, args.models, args.chunk_rows, args.epochs, args.rounds, args.seed,
+               args.spool_dir)